@@ -19,6 +19,11 @@ default_args = {
     'retry_delay': timedelta(minutes=5),
 }
 
+# Profilage à la demande : déclencher le DAG avec la configuration {"profile": true}
+# (artefacts dans reports/profiles/<ts_nodash>/, archivés par archive_daily_results)
+PYTHON_CMD = "PROFILE_RUN_ID={{ ts_nodash }} python"
+PROFILE_FLAG = "{{ '--profile' if dag_run and dag_run.conf and dag_run.conf.get('profile') else '' }}"
+
 # Définition du DAG
 dag = DAG(
     'data_quality_pipeline',
@@ -34,15 +39,18 @@ dag = DAG(
 # TASK GROUP 1 : Import et Nettoyage
 # ========================================
 
+# Rupture du contrat de données (scripts/data_contract.py) : import annulé, morceau fautif
+# en quarantaine (data/quarantine/), code 99 -> tâche "skipped" et tâches en aval ignorées
 import_data = BashOperator(
     task_id='import_raw_data',
-    bash_command='python /opt/airflow/scripts/import_data.py',
+    bash_command=f'{PYTHON_CMD} /opt/airflow/scripts/import_data.py {PROFILE_FLAG}',
+    skip_on_exit_code=99,
     dag=dag,
 )
 
 clean_data = BashOperator(
     task_id='clean_data_6_pillars',
-    bash_command='python /opt/airflow/scripts/cleaning_pipeline.py',
+    bash_command=f'{PYTHON_CMD} /opt/airflow/scripts/cleaning_pipeline.py {PROFILE_FLAG}',
     dag=dag,
 )
 
@@ -52,7 +60,19 @@ clean_data = BashOperator(
 
 run_expectations = BashOperator(
     task_id='run_great_expectations',
-    bash_command='python /opt/airflow/scripts/great_expectations_validator.py',
+    bash_command=f'{PYTHON_CMD} /opt/airflow/scripts/great_expectations_validator.py --fast-startup {PROFILE_FLAG}',
+    dag=dag,
+)
+
+detect_outliers = BashOperator(
+    task_id='detect_outliers',
+    bash_command=f'{PYTHON_CMD} /opt/airflow/scripts/outlier_detection.py {PROFILE_FLAG}',
+    dag=dag,
+)
+
+diff_raw_cleaned = BashOperator(
+    task_id='diff_raw_cleaned',
+    bash_command=f'{PYTHON_CMD} /opt/airflow/scripts/diff_engine.py {PROFILE_FLAG}',
     dag=dag,
 )
 
@@ -133,14 +153,14 @@ send_alerts = PythonOperator(
 # TASK GROUP 5 : Archivage
 # ========================================
 
+# Archive adressée par contenu (scripts/report_archive.py) : rapports dédupliqués et
+# compressés en zstd, indexés par date et par run ; rétention puis compactage incrémental
 archive_results = BashOperator(
     task_id='archive_daily_results',
     bash_command='''
-        DATE=$(date +%Y%m%d)
-        mkdir -p /opt/airflow/archives/$DATE
-        cp /opt/airflow/reports/*.html /opt/airflow/archives/$DATE/
-        cp /opt/airflow/reports/*.json /opt/airflow/archives/$DATE/
-        echo "Résultats archivés pour $DATE"
+        python /opt/airflow/scripts/report_archive.py archive --run-id {{ ts_nodash }} --date {{ ds }} &&
+        python /opt/airflow/scripts/report_archive.py prune &&
+        python /opt/airflow/scripts/report_archive.py compact
     ''',
     dag=dag,
 )
@@ -153,21 +173,29 @@ archive_results = BashOperator(
 # 
 #  import_data
 #       ↓
-#  clean_data
-#       ↓
-#  run_expectations
-#       ↓
-#  calculate_kpis
-#       ↓
-# ┌─────┴─────┐
-# ↓           ↓
-# generate    send
-# dashboard   alerts
-# ↓           ↓
-# └─────┬─────┘
-#       ↓
-#  archive_results
-
-import_data >> clean_data >> run_expectations >> calculate_kpis
+#  clean_data ─────────────────┐
+#       ↓                      ↓
+# ┌─────┴─────┐              diff
+# ↓           ↓              raw_cleaned
+# run         detect           │
+# expectations outliers        │
+# ↓           ↓                │
+# └─────┬─────┘                │
+#       ↓                      │
+#  calculate_kpis              │
+#       ↓                      │
+# ┌─────┴─────┐                │
+# ↓           ↓                │
+# generate    send             │
+# dashboard   alerts           │
+# ↓           ↓                │
+# └─────┬─────┘                │
+#       ↓                      │
+#  archive_results ←───────────┘
+#
+# Le différentiel ne conditionne que l'archivage : son échec ne bloque ni les KPIs ni les alertes
+
+import_data >> clean_data >> [run_expectations, detect_outliers] >> calculate_kpis
 calculate_kpis >> [generate_dashboard, send_alerts]
 [generate_dashboard, send_alerts] >> archive_results
+clean_data >> diff_raw_cleaned >> archive_results
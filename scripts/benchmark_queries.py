@@ -0,0 +1,182 @@
+"""
+Benchmark des requêtes du pipeline (avant/après migrations d'index)
+Pour chaque requête de la charge (KPIs par pilier, moniteur d'alertes, déduplication,
+différentiel, historique pipeline_runs...) : plan EXPLAIN (type d'accès, index, lignes
+estimées) et latences médiane/p95 sur N exécutions.
+Usage:
+  python scripts/benchmark_queries.py --label before
+  python scripts/migrate.py
+  python scripts/benchmark_queries.py --label after
+  python scripts/benchmark_queries.py --compare before after
+"""
+import pymysql
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from statistics import median
+from datasets import DEFAULT_DATASET, get_dataset
+
+DB_CONFIG = {
+    "host": "localhost",
+    "port": 3307,
+    "user": "dq_user",
+    "password": "dq_password",
+    "database": "data_quality"
+}
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(PROJECT_DIR, "reports")
+
+
+def workload(ds):
+    """Requêtes représentatives, paramétrées par le dataset : {nom: (sql, paramètres)}"""
+    raw, cleaned, name = ds["raw_table"], ds["cleaned_table"], ds["name"]
+    return {
+        # quality_kpis.sql : une moyenne par pilier sur les métriques du jour
+        "kpi_pillar_avg": (
+            "SELECT AVG(score) FROM quality_metrics "
+            "WHERE pillar = 'Completude' AND metric_date = CURRENT_DATE() AND dataset = %s", (name,)),
+        # quality_kpis.sql / quality_counters.py : purge des métriques du jour
+        "kpi_delete_today": (
+            "SELECT COUNT(*) FROM quality_metrics WHERE metric_date = CURRENT_DATE() AND dataset = %s", (name,)),
+        # dq_alert_monitor.py : dernier score
+        "alert_latest_score": (
+            "SELECT * FROM quality_scores_history WHERE dataset = %s ORDER BY report_date DESC LIMIT 1", (name,)),
+        # dq_alert_monitor.py : historique par étape du canal performance
+        "alert_stage_history": (
+            "SELECT stage, duration_s, rows_processed, status, started_at, "
+            "ROW_NUMBER() OVER (PARTITION BY stage ORDER BY started_at DESC, id DESC) AS rn "
+            "FROM pipeline_runs WHERE dataset = %s", (name,)),
+        # cleaning_audit.py / stream_watcher.py : recherche d'une transaction brute
+        "raw_lookup_id": (
+            f"SELECT * FROM {raw} WHERE Transaction_ID = (SELECT MAX(Transaction_ID) FROM {raw})", ()),
+        # row_hash.existing_hashes : empreintes déjà chargées
+        "raw_hash_probe": (
+            f"SELECT row_hash FROM {raw} WHERE row_hash IN "
+            f"(SELECT row_hash FROM (SELECT row_hash FROM {raw} LIMIT 1000) sample)", ()),
+        # Dernier chargement (micro-batch, fraîcheur)
+        "raw_recent_load": (
+            f"SELECT COUNT(*) FROM {raw} WHERE loaded_at >= NOW() - INTERVAL 1 DAY", ()),
+        # Filtre de dates sur la table brute (partitions / index idx_transaction_date)
+        "raw_month_range": (
+            f"SELECT COUNT(*), SUM(Total_Amount) FROM {raw} "
+            f"WHERE Transaction_Date >= '2024-01-01' AND Transaction_Date < '2024-02-01'", ()),
+        # great_expectations_validator.py : partition mensuelle de la table nettoyée
+        "cleaned_month_range": (
+            f"SELECT * FROM {cleaned} "
+            f"WHERE Transaction_Date >= '2024-01-01' AND Transaction_Date < '2024-02-01'", ()),
+        # diff_engine.py : plage de clés triée
+        "diff_key_range": (
+            f"SELECT * FROM {raw} WHERE Transaction_ID BETWEEN 1 AND 50000 "
+            f"ORDER BY Transaction_ID, load_seq", ()),
+    }
+
+
+def explain(cursor, sql, params):
+    cursor.execute(f"EXPLAIN {sql}", params)
+    columns = [c[0] for c in cursor.description]
+    return [
+        {k: row[columns.index(k)] for k in ("table", "type", "possible_keys", "key", "rows", "Extra")
+         if k in columns}
+        for row in cursor.fetchall()
+    ]
+
+
+def time_query(cursor, sql, params, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "median_ms": round(median(latencies), 3),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3),
+        "min_ms": round(latencies[0], 3),
+    }
+
+
+def report_path(label):
+    return os.path.join(REPORT_DIR, f"query_benchmark_{label}.json")
+
+
+def run_benchmark(label, repeats=20, dataset=DEFAULT_DATASET):
+    ds = get_dataset(dataset)
+    print("=" * 60)
+    print(f"BENCHMARK DES REQUÊTES ({label})")
+    print("=" * 60)
+    conn = pymysql.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    migrations = applied_versions(cursor)
+
+    results = {}
+    for name, (sql, params) in workload(ds).items():
+        try:
+            plan = explain(cursor, sql, params)
+            cursor.execute(sql, params)  # échauffement du buffer pool
+            cursor.fetchall()
+            timing = time_query(cursor, sql, params, repeats)
+        except pymysql.MySQLError as e:
+            print(f"  [WARN] {name} : {e}")
+            continue
+        results[name] = {"sql": sql, "plan": plan, **timing}
+        keys = ", ".join(str(step.get("key")) for step in plan)
+        print(f"  {name:<22} {timing['median_ms']:>9.2f} ms (p95 {timing['p95_ms']:.2f})  index: {keys}")
+    conn.close()
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "label": label,
+        "dataset": ds["name"],
+        "repeats": repeats,
+        "migrations": migrations,
+        "queries": results,
+    }
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    with open(report_path(label), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False, default=str)
+    print(f"\nRapport JSON : {report_path(label)}")
+    return report
+
+
+def applied_versions(cursor):
+    """Migrations appliquées au moment du relevé (vide avant la première migration)"""
+    cursor.execute("SHOW TABLES LIKE 'schema_migrations'")
+    if cursor.fetchone() is None:
+        return []
+    cursor.execute("SELECT version FROM schema_migrations ORDER BY version")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def compare(before, after):
+    """Compare deux benchmarks : gain de latence médiane et changement de plan par requête"""
+    with open(report_path(before), "r", encoding="utf-8") as f:
+        old = json.load(f)["queries"]
+    with open(report_path(after), "r", encoding="utf-8") as f:
+        new = json.load(f)["queries"]
+    print(f"{'Requête':<22} {before:>10} {after:>10}  gain   plan")
+    for name in old:
+        if name not in new:
+            continue
+        a, b = old[name]["median_ms"], new[name]["median_ms"]
+        speedup = f"x{a / b:.1f}" if b > 0 else "-"
+        plan_a = "/".join(f"{s.get('type')}:{s.get('key')}" for s in old[name]["plan"])
+        plan_b = "/".join(f"{s.get('type')}:{s.get('key')}" for s in new[name]["plan"])
+        plan = plan_b if plan_a == plan_b else f"{plan_a} -> {plan_b}"
+        print(f"{name:<22} {a:>8.2f}ms {b:>8.2f}ms {speedup:>6}  {plan}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plans EXPLAIN et latences des requêtes du pipeline")
+    parser.add_argument("--label", default="current", help="Nom du relevé (ex. before, after)")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--compare", nargs=2, metavar=("AVANT", "APRÈS"), help="Compare deux relevés")
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run_benchmark(args.label, args.repeats, args.dataset)
@@ -0,0 +1,170 @@
+"""
+Piste d'audit du nettoyage, ligne par ligne
+Pour chaque Transaction_ID : un masque de bits des règles appliquées, et la valeur
+d'origine des seules cellules modifiées, stockée en colonnes dans un fichier .npz compressé.
+Usage: python scripts/cleaning_audit.py [--id 8223] [--rule abs_price] [--column Unit_Price]
+"""
+import numpy as np
+import pandas as pd
+import argparse
+import os
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUDIT_PATH = os.path.join(PROJECT_DIR, "reports", "cleaning_audit.npz")
+
+# Un bit par règle de nettoyage (uint16)
+RULES = {
+    "impute_payment": 1 << 0,
+    "impute_product": 1 << 1,
+    "impute_price": 1 << 2,
+    "impute_quantity": 1 << 3,
+    "abs_price": 1 << 4,
+    "force_quantity": 1 << 5,
+    "recompute_total": 1 << 6,
+    "normalize_city": 1 << 7,
+    "normalize_name": 1 << 8,
+}
+
+
+class AuditRecorder:
+    """Collecte les règles appliquées pendant le nettoyage (positions = lignes du DataFrame)"""
+
+    def __init__(self, transaction_ids):
+        start = time.perf_counter()
+        self.ids = np.asarray(transaction_ids, dtype=np.int64)
+        self.masks = np.zeros(len(self.ids), dtype=np.uint16)
+        self.originals = {}
+        self.elapsed = time.perf_counter() - start
+
+    def record(self, rule, touched, column=None, before=None):
+        """Marque les lignes touchées par une règle et conserve l'ancienne valeur de la cellule.
+
+        Si une cellule a déjà été modifiée par une règle précédente, sa valeur d'origine est conservée.
+        """
+        start = time.perf_counter()
+        touched = np.asarray(touched, dtype=bool)
+        self.masks[touched] |= RULES[rule]
+        if column is not None:
+            seen, positions, values = self.originals.setdefault(
+                column, (np.zeros(len(self.ids), dtype=bool), [], [])
+            )
+            new = np.flatnonzero(touched & ~seen)
+            seen[new] = True
+            positions.append(new)
+            values.append(np.asarray(before)[new].astype(object))
+        self.elapsed += time.perf_counter() - start
+
+    def record_change(self, rule, column, before, after):
+        """Comme record(), le masque étant déduit de la comparaison avant/après (NULL compris)"""
+        start = time.perf_counter()
+        touched = ((before.isna() & after.notna()) | (before.notna() & (before != after))).to_numpy()
+        self.elapsed += time.perf_counter() - start
+        self.record(rule, touched, column, before)
+        return int(touched.sum())
+
+    def save(self, path=AUDIT_PATH):
+        """Écrit la piste d'audit ; seules les cellules touchées sont stockées"""
+        start = time.perf_counter()
+        arrays = {"transaction_id": self.ids, "rule_mask": self.masks}
+        for column, (_, positions, values) in self.originals.items():
+            positions = np.concatenate(positions)
+            kept = np.concatenate(values)
+            nulls = pd.isna(kept)
+            numeric = pd.to_numeric(pd.Series(kept[~nulls]), errors="coerce")
+            arrays[f"{column}__id"] = self.ids[positions]
+            arrays[f"{column}__null"] = nulls.astype(bool)
+            if numeric.notna().all():
+                filled = np.full(len(kept), np.nan)
+                filled[~nulls] = numeric.to_numpy(dtype=np.float64)
+                arrays[f"{column}__value"] = filled
+            else:
+                arrays[f"{column}__value"] = np.where(nulls, "", kept.astype(str)).astype(str)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(path, **arrays)
+        self.elapsed += time.perf_counter() - start
+        return path
+
+
+class AuditTrail:
+    """Lecture et requêtes sur une piste d'audit sauvegardée"""
+
+    def __init__(self, path=AUDIT_PATH):
+        with np.load(path) as data:
+            order = np.argsort(data["transaction_id"], kind="stable")
+            self.ids = data["transaction_id"][order]
+            self.masks = data["rule_mask"][order]
+            self.columns = {}
+            for key in data.files:
+                if key.endswith("__id"):
+                    column = key[:-len("__id")]
+                    col_order = np.argsort(data[key], kind="stable")
+                    self.columns[column] = (
+                        data[key][col_order],
+                        data[f"{column}__value"][col_order],
+                        data[f"{column}__null"][col_order],
+                    )
+
+    def _position(self, ids, transaction_id):
+        pos = np.searchsorted(ids, transaction_id)
+        if pos < len(ids) and ids[pos] == transaction_id:
+            return pos
+        return None
+
+    def rules_for(self, transaction_id):
+        """Noms des règles appliquées à une transaction"""
+        pos = self._position(self.ids, transaction_id)
+        if pos is None:
+            return []
+        return [name for name, bit in RULES.items() if self.masks[pos] & bit]
+
+    def transactions_with(self, rule):
+        """Transaction_ID touchés par une règle"""
+        return self.ids[(self.masks & RULES[rule]) != 0]
+
+    def original_value(self, transaction_id, column):
+        """(modifiée ?, valeur avant nettoyage) ; la valeur d'une cellule modifiée peut être None (NULL)"""
+        if column not in self.columns:
+            return False, None
+        ids, values, nulls = self.columns[column]
+        pos = self._position(ids, transaction_id)
+        if pos is None:
+            return False, None
+        return True, None if nulls[pos] else values[pos].item()
+
+    def changed_cells(self, column):
+        """DataFrame (Transaction_ID, valeur d'origine) des cellules modifiées d'une colonne"""
+        ids, values, nulls = self.columns.get(column, (np.array([]), np.array([]), np.array([], dtype=bool)))
+        original = pd.Series(values, dtype=object)
+        original[nulls] = None
+        return pd.DataFrame({"Transaction_ID": ids, "original": original})
+
+    def summary(self):
+        """Nombre de lignes touchées par règle"""
+        return {name: int(((self.masks & bit) != 0).sum()) for name, bit in RULES.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Requêtes sur la piste d'audit du nettoyage")
+    parser.add_argument("--path", default=AUDIT_PATH)
+    parser.add_argument("--id", type=int, help="Règles et valeurs d'origine d'une transaction")
+    parser.add_argument("--rule", choices=list(RULES), help="Transactions touchées par une règle")
+    parser.add_argument("--column", help="Cellules modifiées d'une colonne")
+    args = parser.parse_args()
+
+    trail = AuditTrail(args.path)
+    if args.id is not None:
+        print(f"Transaction {args.id} : {', '.join(trail.rules_for(args.id)) or 'aucune règle'}")
+        for column in trail.columns:
+            modified, value = trail.original_value(args.id, column)
+            if modified:
+                print(f"  - {column} d'origine : {'NULL' if value is None else value}")
+    elif args.rule:
+        ids = trail.transactions_with(args.rule)
+        print(f"{len(ids)} transactions touchées par {args.rule}")
+        print(ids[:50].tolist())
+    elif args.column:
+        print(trail.changed_cells(args.column).to_string(index=False, max_rows=50))
+    else:
+        for name, count in trail.summary().items():
+            print(f"  {name:<16} {count}")
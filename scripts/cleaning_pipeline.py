@@ -1,9 +1,17 @@
 import pandas as pd
 import numpy as np
 import pymysql
+import argparse
 import json
 import os
+import time
 from datetime import datetime
+import sys
+from cleaning_audit import AuditRecorder
+from datasets import DEFAULT_DATASET, get_dataset, report_name
+from pipeline_metrics import stage_timer
+from profiling import profiled
+from row_hash import RAW_ORDER, row_hashes
 
 DB_CONFIG = {
     "host": "localhost",
@@ -13,110 +21,217 @@ DB_CONFIG = {
     "database": "data_quality"
 }
 
-REPORT_DIR = r"c:\Users\idirt\OneDrive\Bureau\Mabrouk Hannachi\data-quality-pipeline\reports"
-DATA_DIR = r"c:\Users\idirt\OneDrive\Bureau\Mabrouk Hannachi\data-quality-pipeline\data\cleaned"
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(PROJECT_DIR, "reports")
+DATA_DIR = os.path.join(PROJECT_DIR, "data", "cleaned")
 os.makedirs(REPORT_DIR, exist_ok=True)
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def cleaning_pipeline():
-    print("\n--- DÉMARRAGE DU PIPELINE DE NETTOYAGE ---\n")
-    
-    print("[1/4] Chargement des données brutes depuis MariaDB...")
-    conn = pymysql.connect(**DB_CONFIG)
-    query = "SELECT * FROM retail_raw"
-    df = pd.read_sql(query, conn)
-    print(f"  {len(df)} lignes chargées.")
-    
-    initial_count = len(df)
-    cleaning_stats = {
-        "initial_rows": initial_count,
-        "steps": []
-    }
+CLEANED_COLS = [
+    "Transaction_ID", "Customer_ID", "Customer_Name", "Product_Category",
+    "Product_Name", "Unit_Price", "Quantity", "Total_Amount",
+    "Payment_Method", "City", "Transaction_Date"
+]
+
+# Écart toléré entre Total_Amount et Unit_Price * Quantity (règle de cohérence des KPIs) pour
+# le décompte du rapport ; la piste d'audit trace toute réécriture de la valeur
+TOTAL_TOLERANCE = 0.05
 
+def clean_dataframe(df, cleaning_stats, with_audit=False):
+    """Applique les règles des 6 piliers. Retourne (df nettoyé, AuditRecorder ou None)"""
     print("\n[A] Traitement de l'UNICITÉ...")
-    dupes = df.duplicated().sum()
-    df = df.drop_duplicates()
+    # Doublons exacts sur l'empreinte row_hash calculée à l'import (calculée ici si absente)
+    if 'row_hash' in df.columns and df['row_hash'].notna().all():
+        hashes = df['row_hash'].to_numpy(dtype=np.uint64)
+    else:
+        hashes = row_hashes(df)
+    exact = pd.Series(hashes, index=df.index).duplicated().to_numpy()
+    dupes = exact.sum()
+    df = df[~exact].drop(columns=['row_hash'], errors='ignore')
     print(f"  - Supprimé {dupes} doublons exacts.")
     cleaning_stats["steps"].append({"step": "deduplication_exact", "removed": int(dupes)})
     
     dupes_id = df.duplicated(subset=['Transaction_ID']).sum()
-    df = df.drop_duplicates(subset=['Transaction_ID'], keep='first')
+    df = df.drop_duplicates(subset=['Transaction_ID'], keep='first').reset_index(drop=True)
     print(f"  - Supprimé {dupes_id} doublons de Transaction_ID.")
     cleaning_stats["steps"].append({"step": "deduplication_id", "removed": int(dupes_id)})
 
+    audit = AuditRecorder(df['Transaction_ID']) if with_audit else None
+
     print("\n[B] Traitement de la COMPLÉTUDE...")
-    nulls_pay = df['Payment_Method'].isnull().sum()
+    missing_pay = df['Payment_Method'].isnull()
+    nulls_pay = missing_pay.sum()
+    if audit is not None:
+        audit.record("impute_payment", missing_pay, 'Payment_Method', df['Payment_Method'])
     df['Payment_Method'] = df['Payment_Method'].fillna('Unknown')
     print(f"  - Imputé {nulls_pay} 'Payment_Method' manquants avec 'Unknown'.")
     
-    nulls_prod = df['Product_Name'].isnull().sum()
+    missing_prod = df['Product_Name'].isnull()
+    nulls_prod = missing_prod.sum()
+    if audit is not None:
+        audit.record("impute_product", missing_prod, 'Product_Name', df['Product_Name'])
     df['Product_Name'] = df['Product_Name'].fillna('Product Unknown')
     print(f"  - Imputé {nulls_prod} 'Product_Name' manquants.")
 
     median_price = df['Unit_Price'].median()
-    nulls_price = df['Unit_Price'].isnull().sum()
+    missing_price = df['Unit_Price'].isnull()
+    nulls_price = missing_price.sum()
+    if audit is not None:
+        audit.record("impute_price", missing_price, 'Unit_Price', df['Unit_Price'])
     df['Unit_Price'] = df['Unit_Price'].fillna(median_price)
     
-    cols_qty_null = df['Quantity'].isnull().sum()
+    missing_qty = df['Quantity'].isnull()
+    cols_qty_null = missing_qty.sum()
+    if audit is not None:
+        audit.record("impute_quantity", missing_qty, 'Quantity', df['Quantity'])
     df['Quantity'] = df['Quantity'].fillna(1)
     
     print(f"  - Imputé {nulls_price} prix (médiane: {median_price:.2f}) et {cols_qty_null} quantités (défaut: 1).")
 
     print("\n[C] Traitement de la VALIDITÉ...")
-    neg_price = (df['Unit_Price'] < 0).sum()
+    negative_price = df['Unit_Price'] < 0
+    neg_price = negative_price.sum()
+    if audit is not None:
+        audit.record("abs_price", negative_price, 'Unit_Price', df['Unit_Price'])
     df['Unit_Price'] = df['Unit_Price'].abs()
     print(f"  - Corrigé {neg_price} prix négatifs (valeur absolue).")
     
-    neg_qty = (df['Quantity'] <= 0).sum()
-    df.loc[df['Quantity'] <= 0, 'Quantity'] = 1
+    invalid_qty = df['Quantity'] <= 0
+    neg_qty = invalid_qty.sum()
+    if audit is not None:
+        audit.record("force_quantity", invalid_qty, 'Quantity', df['Quantity'])
+    df.loc[invalid_qty, 'Quantity'] = 1
     print(f"  - Corrigé {neg_qty} quantités négatives/nulles (forcé à 1).")
 
     print("\n[D] Traitement de la COHÉRENCE...")
-    inconsistent = df[abs(df['Total_Amount'] - (df['Unit_Price'] * df['Quantity'])) > 0.05]
-    count_inc = len(inconsistent)
+    recomputed = df['Unit_Price'] * df['Quantity']
+    count_inc = int(((df['Total_Amount'] - recomputed).abs() > TOTAL_TOLERANCE).sum())
     nulls_total = df['Total_Amount'].isnull().sum()
     
-    df['Total_Amount'] = df['Unit_Price'] * df['Quantity']
+    if audit is not None:
+        # Toute valeur réécrite est tracée, au centime près (DECIMAL(10, 2)) ; la tolérance
+        # ne sert qu'au décompte des incohérences ci-dessus
+        audit.record_change("recompute_total", 'Total_Amount', df['Total_Amount'], recomputed.round(2))
+    df['Total_Amount'] = recomputed
     print(f"  - Recalculé {count_inc + nulls_total} montants totaux (incohérents ou manquants).")
 
     print("\n[E] Traitement de l'EXACTITUDE...")
-    df['City'] = df['City'].str.strip().str.title()
-    df['Customer_Name'] = df['Customer_Name'].str.strip().str.title()
+    city = df['City'].str.strip().str.title()
+    name = df['Customer_Name'].str.strip().str.title()
+    if audit is not None:
+        audit.record_change("normalize_city", 'City', df['City'], city)
+        audit.record_change("normalize_name", 'Customer_Name', df['Customer_Name'], name)
+    df['City'] = city
+    df['Customer_Name'] = name
+
+    return df, audit
+
+def _secondary_indexes(cursor, table):
+    """Index hors clé primaire : {nom: (unique, [colonnes])}"""
+    cursor.execute(f"SHOW INDEX FROM {table}")
+    indexes = {}
+    for row in cursor.fetchall():
+        # Table, Non_unique, Key_name, Seq_in_index, Column_name, ...
+        if row[2] != "PRIMARY":
+            indexes.setdefault(row[2], (not row[1], []))[1].append(row[4])
+    return indexes
+
+def publish_cleaned(conn, table, df, chunk_size=5000):
+    """Publie df dans table par échange atomique avec une table de staging.
+
+    Chargement en masse dans {table}_staging (index secondaires créés après le chargement,
+    une seule transaction), contrôle du nombre de lignes, puis RENAME TABLE : les lecteurs
+    voient l'ancienne version complète jusqu'à l'échange, jamais une table vide ou partielle.
+    Lève une exception en cas d'échec ; la table publiée n'est alors pas modifiée.
+    """
+    staging, previous = f"{table}_staging", f"{table}_old"
+    values = df[CLEANED_COLS].sort_values("Transaction_ID").astype(object)
+    rows = list(values.where(values.notna(), None).itertuples(index=False, name=None))
+    sql = f"INSERT INTO {staging} ({', '.join(CLEANED_COLS)}) VALUES ({', '.join(['%s'] * len(CLEANED_COLS))})"
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TABLE {staging} LIKE {table}")
+        deferred = _secondary_indexes(cursor, staging)
+        for name in deferred:
+            cursor.execute(f"ALTER TABLE {staging} DROP INDEX {name}")
+
+        # Lignes triées par clé primaire (insertion séquentielle) ; la clé primaire reste contrôlée
+        cursor.execute("SET SESSION unique_checks = 0")
+        for start in range(0, len(rows), chunk_size):
+            cursor.executemany(sql, rows[start:start + chunk_size])
+        conn.commit()
+        cursor.execute("SET SESSION unique_checks = 1")
+
+        if deferred:
+            cursor.execute(f"ALTER TABLE {staging} " + ", ".join(
+                f"ADD {'UNIQUE ' if unique else ''}INDEX {name} ({', '.join(columns)})"
+                for name, (unique, columns) in deferred.items()
+            ))
+
+        cursor.execute(f"SELECT COUNT(*) FROM {staging}")
+        loaded = cursor.fetchone()[0]
+        if loaded != len(rows):
+            raise RuntimeError(f"{staging} : {loaded} lignes chargées, {len(rows)} attendues")
+
+        cursor.execute(f"DROP TABLE IF EXISTS {previous}")
+        cursor.execute(f"RENAME TABLE {table} TO {previous}, {staging} TO {table}")
+        cursor.execute(f"DROP TABLE {previous}")
+    except Exception:
+        # Nettoyage au mieux : son propre échec ne doit pas masquer l'erreur d'origine
+        try:
+            conn.rollback()
+            cursor.execute("SET SESSION unique_checks = 1")
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        except Exception as cleanup_error:
+            print(f"  [WARN] Nettoyage de {staging} impossible : {cleanup_error}")
+        raise
+
+def cleaning_pipeline(with_audit=True, dataset=DEFAULT_DATASET):
+    ds = get_dataset(dataset)
+    with stage_timer(ds["name"], "clean") as run:
+        run["rows"], published = _cleaning_pipeline(ds, with_audit)
+        if not published:
+            run["status"] = "failed"
+    return published
+
+def _cleaning_pipeline(ds, with_audit):
+    raw_table, cleaned_table = ds["raw_table"], ds["cleaned_table"]
+    print(f"\n--- DÉMARRAGE DU PIPELINE DE NETTOYAGE ({ds['name']}) ---\n")
+    
+    print("[1/4] Chargement des données brutes depuis MariaDB...")
+    conn = pymysql.connect(**DB_CONFIG)
+    query = f"SELECT * FROM {raw_table} ORDER BY {RAW_ORDER}"
+    df = pd.read_sql(query, conn)
+    print(f"  {len(df)} lignes chargées.")
+    
+    initial_count = len(df)
+    cleaning_stats = {
+        "initial_rows": initial_count,
+        "steps": []
+    }
+
+    clean_start = time.perf_counter()
+    df, audit = clean_dataframe(df, cleaning_stats, with_audit=with_audit)
+    clean_elapsed = time.perf_counter() - clean_start
 
     print("\n[3/4] Sauvegarde des données...")
     
-    csv_path = os.path.join(DATA_DIR, "Retail_Cleaned.csv")
+    csv_path = os.path.join(DATA_DIR, ds["cleaned_csv"])
     df.to_csv(csv_path, index=False)
     print(f"  - CSV sauvegardé : {csv_path}")
     
+    published = False
     try:
-        cursor = conn.cursor()
-        cursor.execute("TRUNCATE TABLE retail_cleaned")
-        
-        cols = [
-            "Transaction_ID", "Customer_ID", "Customer_Name", "Product_Category", 
-            "Product_Name", "Unit_Price", "Quantity", "Total_Amount", 
-            "Payment_Method", "City", "Transaction_Date"
-        ]
-        
-        batch_size = 1000
-        batch = []
-        sql = f"INSERT INTO retail_cleaned ({', '.join(cols)}) VALUES ({', '.join(['%s']*len(cols))})"
-        
-        for _, row in df.iterrows():
-            batch.append(tuple(row[c] for c in cols))
-            if len(batch) >= batch_size:
-                cursor.executemany(sql, batch)
-                conn.commit()
-                batch = []
-        
-        if batch:
-            cursor.executemany(sql, batch)
-            conn.commit()
-            
-        print(f"  - Table 'retail_cleaned' remplie : {len(df)} lignes.")
+        publish_start = time.perf_counter()
+        publish_cleaned(conn, cleaned_table, df)
+        cleaning_stats["publish_s"] = round(time.perf_counter() - publish_start, 3)
+        print(f"  - Table '{cleaned_table}' publiée : {len(df)} lignes ({cleaning_stats['publish_s']}s).")
+        published = True
     except Exception as e:
         print(f"  ERREUR SQL : {e}")
+        print(f"  - '{cleaned_table}' inchangée (version précédente conservée).")
     finally:
         conn.close()
 
@@ -124,12 +239,32 @@ def cleaning_pipeline():
     cleaning_stats["final_rows"] = final_count
     cleaning_stats["rows_removed"] = initial_count - final_count
     
-    json_path = os.path.join(REPORT_DIR, "cleaning_report.json")
+    if audit is not None:
+        audit_path = audit.save(os.path.join(REPORT_DIR, report_name(ds, "cleaning_audit.npz")))
+        cleaning_stats["audit"] = {
+            "path": audit_path,
+            "rows_touched": int((audit.masks != 0).sum()),
+            "overhead_s": round(audit.elapsed, 4),
+            "cleaning_s": round(clean_elapsed, 4),
+            "overhead_pct": round(100 * audit.elapsed / max(clean_elapsed - audit.elapsed, 1e-9), 2),
+        }
+        print(f"  - Piste d'audit : {audit_path} (surcoût {cleaning_stats['audit']['overhead_pct']}%)")
+    
+    json_path = os.path.join(REPORT_DIR, report_name(ds, "cleaning_report.json"))
     with open(json_path, 'w') as f:
         json.dump(cleaning_stats, f, indent=4)
     print(f"  - Rapport JSON généré : {json_path}")
 
     print(f"\nsuccès : {initial_count} -> {final_count} lignes conservées.")
+    return final_count, published
 
 if __name__ == "__main__":
-    cleaning_pipeline()
+    parser = argparse.ArgumentParser(description="Pipeline de nettoyage {prefix}_raw -> {prefix}_cleaned")
+    parser.add_argument("--no-audit", action="store_true", help="Désactive la piste d'audit ligne par ligne")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--profile", action="store_true", help="Profil CPU/allocations dans reports/profiles/")
+    args = parser.parse_args()
+    with profiled(f"clean_{args.dataset}", args.profile):
+        published = cleaning_pipeline(with_audit=not args.no_audit, dataset=args.dataset)
+    if not published:
+        sys.exit(1)
@@ -0,0 +1,198 @@
+"""
+Contrat de données des flux CSV, vérifié pendant l'import (import_data.py)
+Le CSV est lu par morceaux : l'en-tête est contrôlé avant tout chargement, puis chaque
+morceau (types, format Customer_ID, taux d'erreur plafonnés) avant son insertion.
+Une rupture de contrat interrompt l'import dès le morceau fautif, qui est mis en
+quarantaine dans data/quarantine/ avec le détail des violations.
+Usage: python scripts/data_contract.py [--dataset retail] [--chunk-size 5000]
+"""
+import pandas as pd
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from datasets import DEFAULT_DATASET, get_dataset
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUARANTINE_DIR = os.path.join(PROJECT_DIR, "data", "quarantine")
+CHUNK_SIZE = 5000
+
+# Code de sortie d'une rupture de contrat : le BashOperator d'Airflow marque la tâche
+# "skipped" (skip_on_exit_code) et les tâches en aval ne sont pas exécutées.
+EXIT_CONTRACT_BREACH = 99
+
+CONTRACT = {
+    "columns": [
+        "Transaction_ID", "Customer_ID", "Customer_Name", "Product_Category",
+        "Product_Name", "Unit_Price", "Quantity", "Total_Amount",
+        "Payment_Method", "City", "Transaction_Date"
+    ],
+    "types": {
+        "Transaction_ID": "integer",
+        "Unit_Price": "number",
+        "Quantity": "number",
+        "Total_Amount": "number",
+        "Transaction_Date": "date",
+    },
+    "patterns": {
+        "Customer_ID": r"^CUST-\d{4}$",
+    },
+    # Plafonds par morceau. Les valeurs manquantes de Produit/Prix/Quantité sont attendues
+    # (corrigées par le nettoyage) ; la clé et le client ne doivent jamais manquer.
+    "max_null_rate": {"Transaction_ID": 0.0, "Customer_ID": 0.0, "*": 0.25},
+    "max_type_error_rate": 0.01,
+    "max_pattern_error_rate": 0.01,
+}
+
+
+class ContractViolation(Exception):
+    """Rupture du contrat : violations constatées et morceau fautif (None pour l'en-tête)"""
+
+    def __init__(self, violations, chunk_index=None, chunk=None):
+        super().__init__("; ".join(violations))
+        self.violations = violations
+        self.chunk_index = chunk_index
+        self.chunk = chunk
+
+
+def check_header(columns, contract=CONTRACT):
+    """Violations de l'en-tête : colonnes manquantes, inattendues ou en double"""
+    expected = contract["columns"]
+    violations = []
+    missing = [c for c in expected if c not in columns]
+    unexpected = [c for c in columns if c not in expected]
+    duplicated = sorted({c for c in columns if list(columns).count(c) > 1})
+    if missing:
+        violations.append(f"colonnes manquantes : {missing}")
+    if unexpected:
+        violations.append(f"colonnes inattendues : {unexpected}")
+    if duplicated:
+        violations.append(f"colonnes en double : {duplicated}")
+    if len(columns) != len(expected) and not violations:
+        violations.append(f"{len(columns)} colonnes au lieu de {len(expected)}")
+    return violations
+
+
+def _parse(values, kind):
+    """Valeurs converties (NaN/NaT si illisibles) et masque des valeurs présentes mais illisibles"""
+    present = values.notna()
+    if kind == "date":
+        parsed = pd.to_datetime(values, format="%Y-%m-%d", errors="coerce")
+    else:
+        parsed = pd.to_numeric(values, errors="coerce")
+    invalid = present & parsed.isna()
+    if kind == "integer":
+        invalid |= present & parsed.notna() & (parsed % 1 != 0)
+    return parsed, invalid
+
+
+def check_chunk(chunk, contract=CONTRACT):
+    """Contrôle un morceau lu en texte (dtype=str) : (statistiques, violations)"""
+    rows = len(chunk)
+    stats = {"rows": rows, "nulls": {}, "type_errors": {}, "pattern_errors": {}}
+    violations = []
+    if rows == 0:
+        return stats, violations
+
+    ceilings = contract["max_null_rate"]
+    for column in contract["columns"]:
+        nulls = int(chunk[column].isna().sum())
+        if nulls:
+            stats["nulls"][column] = nulls
+        ceiling = ceilings.get(column, ceilings["*"])
+        if nulls / rows > ceiling:
+            violations.append(f"{column} : {nulls / rows:.1%} de valeurs manquantes (plafond {ceiling:.0%})")
+
+    for column, kind in contract["types"].items():
+        _, invalid = _parse(chunk[column], kind)
+        errors = int(invalid.sum())
+        if errors:
+            stats["type_errors"][column] = errors
+        if errors / rows > contract["max_type_error_rate"]:
+            examples = chunk.loc[invalid, column].head(3).tolist()
+            violations.append(f"{column} : {errors / rows:.1%} de valeurs non conformes au type {kind} "
+                              f"(plafond {contract['max_type_error_rate']:.0%}, ex. {examples})")
+
+    for column, pattern in contract["patterns"].items():
+        values = chunk[column].dropna()
+        errors = int((~values.str.match(pattern)).sum())
+        if errors:
+            stats["pattern_errors"][column] = errors
+        if errors / rows > contract["max_pattern_error_rate"]:
+            violations.append(f"{column} : {errors / rows:.1%} de valeurs hors format {pattern} "
+                              f"(plafond {contract['max_pattern_error_rate']:.0%})")
+    return stats, violations
+
+
+def typed_chunk(chunk, contract=CONTRACT):
+    """Morceau conforme converti pour l'insertion : valeurs illisibles (sous le plafond) mises à NULL"""
+    chunk = chunk.copy()
+    for column, kind in contract["types"].items():
+        parsed, invalid = _parse(chunk[column], kind)
+        if kind == "date":
+            chunk[column] = chunk[column].where(~invalid)
+        else:
+            chunk[column] = parsed
+    return chunk
+
+
+def read_chunks(csv_path, chunk_size=CHUNK_SIZE, contract=CONTRACT):
+    """Morceaux contrôlés du CSV : [(index, morceau typé, statistiques)] ; lève ContractViolation"""
+    header = list(pd.read_csv(csv_path, nrows=0).columns)
+    violations = check_header(header, contract)
+    if violations:
+        raise ContractViolation(violations, 0, pd.read_csv(csv_path, dtype=str, nrows=chunk_size))
+    for index, chunk in enumerate(pd.read_csv(csv_path, dtype=str, chunksize=chunk_size)):
+        stats, violations = check_chunk(chunk, contract)
+        if violations:
+            raise ContractViolation(violations, index, chunk)
+        yield index, typed_chunk(chunk, contract), stats
+
+
+def quarantine(ds, violation, csv_path):
+    """Écrit le morceau fautif et ses violations dans data/quarantine/ ; retourne le chemin du CSV"""
+    os.makedirs(QUARANTINE_DIR, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    base = os.path.join(QUARANTINE_DIR, f"{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                                        f"_chunk{violation.chunk_index}")
+    if violation.chunk is not None:
+        violation.chunk.to_csv(f"{base}.csv", index=False)
+    with open(f"{base}.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "dataset": ds["name"],
+            "source": csv_path,
+            "chunk_index": violation.chunk_index,
+            "violations": violation.violations,
+        }, f, indent=4, ensure_ascii=False)
+    return f"{base}.csv"
+
+
+def check_file(dataset=DEFAULT_DATASET, chunk_size=CHUNK_SIZE):
+    """Contrôle complet d'un CSV sans chargement ; retourne True si le contrat est respecté"""
+    ds = get_dataset(dataset)
+    print("=" * 60)
+    print(f"CONTRAT DE DONNÉES {ds['name'].upper()}")
+    print("=" * 60)
+    rows = 0
+    try:
+        for index, chunk, stats in read_chunks(ds["csv_path"], chunk_size):
+            rows += len(chunk)
+            print(f"  Morceau {index} : {stats['rows']} lignes conformes")
+    except ContractViolation as e:
+        print(f"\n  RUPTURE DE CONTRAT (morceau {e.chunk_index}) :")
+        for violation in e.violations:
+            print(f"    - {violation}")
+        return False
+    print(f"\n  Contrat respecté : {rows} lignes")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vérifie le contrat de données d'un CSV sans le charger")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    if not check_file(args.dataset, args.chunk_size):
+        sys.exit(EXIT_CONTRACT_BREACH)
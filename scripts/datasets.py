@@ -0,0 +1,97 @@
+"""
+Registre des datasets (flux magasins) traités par le pipeline
+Chaque dataset a son CSV source, son préfixe de tables ({prefix}_raw, {prefix}_cleaned)
+et sa suite d'expectations. 'retail' est le dataset historique ; les autres flux
+sont déclarés dans config/datasets.json :
+    [{"name": "store_lyon", "csv": "data/raw/Store_Lyon.csv", "table_prefix": "store_lyon"}]
+"""
+import json
+import os
+import re
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGISTRY_PATH = os.path.join(PROJECT_DIR, "config", "datasets.json")
+DEFAULT_DATASET = "retail"
+
+BUILTIN_DATASETS = [
+    {
+        "name": "retail",
+        "csv": os.path.join("data", "raw", "Retail_Store_Sales.csv"),
+        "table_prefix": "retail",
+        "suite": "retail_quality_suite",
+        "cleaned_csv": "Retail_Cleaned.csv",
+    },
+]
+
+
+def _complete(entry):
+    """Complète une entrée du registre avec les chemins et noms dérivés"""
+    name = entry["name"]
+    prefix = entry.get("table_prefix", name)
+    if not re.fullmatch(r"[A-Za-z0-9_]+", prefix):
+        raise ValueError(f"Préfixe de table invalide pour {name} : {prefix}")
+    csv_path = entry["csv"]
+    if not os.path.isabs(csv_path):
+        csv_path = os.path.join(PROJECT_DIR, csv_path)
+    return {
+        "name": name,
+        "csv_path": csv_path,
+        "table_prefix": prefix,
+        "raw_table": f"{prefix}_raw",
+        "cleaned_table": f"{prefix}_cleaned",
+        "suite": entry.get("suite", f"{prefix}_quality_suite"),
+        "cleaned_csv": entry.get("cleaned_csv", f"{prefix}_cleaned.csv"),
+    }
+
+
+def list_datasets():
+    """Tous les datasets connus : intégrés puis déclarés dans config/datasets.json"""
+    entries = list(BUILTIN_DATASETS)
+    if os.path.exists(REGISTRY_PATH):
+        with open(REGISTRY_PATH, "r", encoding="utf-8") as f:
+            entries += json.load(f)
+    return {e["name"]: _complete(e) for e in entries}
+
+
+def get_dataset(name=DEFAULT_DATASET):
+    datasets = list_datasets()
+    if name not in datasets:
+        raise KeyError(f"Dataset inconnu : {name} (connus : {', '.join(datasets)})")
+    return datasets[name]
+
+
+def report_name(dataset, filename):
+    """Nom de rapport : inchangé pour 'retail', suffixé par le dataset sinon"""
+    if dataset["name"] == DEFAULT_DATASET:
+        return filename
+    base, ext = os.path.splitext(filename)
+    return f"{base}_{dataset['name']}{ext}"
+
+
+def ensure_tables(conn, dataset):
+    """Crée les tables du dataset sur le modèle de retail_* si elles n'existent pas"""
+    cursor = conn.cursor()
+    if dataset["table_prefix"] != "retail":
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {dataset['raw_table']} LIKE retail_raw")
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {dataset['cleaned_table']} LIKE retail_cleaned")
+    # Empreinte de ligne et index de déduplication (bases créées avant cette évolution)
+    cursor.execute(f"ALTER TABLE {dataset['raw_table']} ADD COLUMN IF NOT EXISTS "
+                   "row_hash BIGINT UNSIGNED AFTER Transaction_Date")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_row_hash ON {dataset['raw_table']} (row_hash)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_transaction_id ON {dataset['raw_table']} (Transaction_ID)")
+    # Séquence de chargement (sql/migrations V007) : départage des doublons dans l'ordre du flux
+    cursor.execute(f"ALTER TABLE {dataset['raw_table']} ADD COLUMN IF NOT EXISTS "
+                   "load_seq BIGINT UNSIGNED NOT NULL AUTO_INCREMENT AFTER loaded_at, "
+                   "ADD INDEX IF NOT EXISTS idx_load_seq (load_seq)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_transaction_id_seq ON {dataset['raw_table']} "
+                   "(Transaction_ID, load_seq)")
+    # Index de la charge (sql/migrations V001/V002), pour les tables créées avant les migrations
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_loaded_at ON {dataset['raw_table']} (loaded_at)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_transaction_date ON {dataset['raw_table']} (Transaction_Date)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_transaction_date ON {dataset['cleaned_table']} (Transaction_Date)")
+    # Colonnes partagées ajoutées pour le multi-dataset (bases créées avant cette évolution)
+    cursor.execute("ALTER TABLE quality_metrics ADD COLUMN IF NOT EXISTS "
+                   "dataset VARCHAR(50) NOT NULL DEFAULT 'retail' AFTER id")
+    cursor.execute("ALTER TABLE quality_scores_history ADD COLUMN IF NOT EXISTS "
+                   "dataset VARCHAR(50) NOT NULL DEFAULT 'retail' AFTER id")
+    conn.commit()
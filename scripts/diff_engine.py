@@ -0,0 +1,230 @@
+"""
+Différentiel ligne à ligne {prefix}_raw -> {prefix}_cleaned
+Les deux tables sont lues par plages de Transaction_ID (index idx_transaction_id et clé
+primaire), triées, puis jointes par clé plage par plage, en parallèle : la mémoire est bornée
+par la taille d'une plage, pas par celle des tables.
+Sorties : nb de modifications par colonne et par type (imputation, normalisation, signe,
+recalcul...), et lignes supprimées par la déduplication.
+Usage: python scripts/diff_engine.py [--partition-size 50000] [--workers 4] [--dataset retail]
+"""
+import pandas as pd
+import numpy as np
+import pymysql
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from datasets import DEFAULT_DATASET, get_dataset, report_name
+from profiling import profiled
+from row_hash import RAW_ORDER, row_hashes
+
+DB_CONFIG = {
+    "host": "localhost",
+    "port": 3307,
+    "user": "dq_user",
+    "password": "dq_password",
+    "database": "data_quality"
+}
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(PROJECT_DIR, "reports")
+
+KEY = "Transaction_ID"
+COLUMNS = [
+    "Customer_ID", "Customer_Name", "Product_Category", "Product_Name", "Unit_Price",
+    "Quantity", "Total_Amount", "Payment_Method", "City", "Transaction_Date"
+]
+NUMERIC_COLUMNS = ("Unit_Price", "Quantity", "Total_Amount")
+DATE_COLUMNS = ("Transaction_Date",)
+TOLERANCE = 0.005  # DECIMAL(10, 2)
+
+
+def id_ranges(conn, ds, partition_size):
+    """Plages [début, fin] de Transaction_ID couvrant les deux tables"""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT MIN(lo), MAX(hi) FROM (
+            SELECT MIN({KEY}) AS lo, MAX({KEY}) AS hi FROM {ds['raw_table']}
+            UNION ALL
+            SELECT MIN({KEY}), MAX({KEY}) FROM {ds['cleaned_table']}
+        ) bounds
+    """)
+    low, high = cursor.fetchone()
+    if low is None:
+        return []
+    return [(start, min(start + partition_size - 1, int(high)))
+            for start in range(int(low), int(high) + 1, partition_size)]
+
+
+def load_range(conn, table, low, high, extra="", order=KEY):
+    """Lignes d'une plage de clés, triées par clé (order départage les doublons)"""
+    return pd.read_sql(
+        f"SELECT {KEY}, {', '.join(COLUMNS)}{extra} FROM {table} "
+        f"WHERE {KEY} BETWEEN %s AND %s ORDER BY {order}",
+        conn, params=(low, high)
+    )
+
+
+def classify(column, before, after):
+    """Nb de cellules modifiées par type de changement, et masque des cellules modifiées"""
+    if column in NUMERIC_COLUMNS:
+        before, after = pd.to_numeric(before, errors="coerce"), pd.to_numeric(after, errors="coerce")
+    elif column in DATE_COLUMNS:
+        before, after = pd.to_datetime(before, errors="coerce"), pd.to_datetime(after, errors="coerce")
+    types = {
+        "imputed": before.isna() & after.notna(),
+        "nulled": before.notna() & after.isna(),
+    }
+    both = before.notna() & after.notna()
+    if column in NUMERIC_COLUMNS:
+        changed = both & ((before - after).abs() > TOLERANCE)
+        types["sign_flipped"] = changed & ((before + after).abs() <= TOLERANCE)
+        types["recomputed" if column == "Total_Amount" else "modified"] = changed & ~types["sign_flipped"]
+    elif column in DATE_COLUMNS:
+        types["modified"] = both & (before != after)
+    else:
+        b, a = before.astype(str), after.astype(str)
+        changed = both & (b != a)
+        types["normalized"] = changed & (b.str.strip().str.casefold() == a.str.strip().str.casefold())
+        types["modified"] = changed & ~types["normalized"]
+    changed_any = np.logical_or.reduce([mask.to_numpy() for mask in types.values()])
+    return {name: int(mask.sum()) for name, mask in types.items() if mask.any()}, changed_any
+
+
+def diff_range(ds, low, high):
+    """Jointure par clé d'une plage : compteurs fusionnables et lignes supprimées"""
+    conn = pymysql.connect(**DB_CONFIG)
+    try:
+        raw = load_range(conn, ds["raw_table"], low, high, extra=", row_hash", order=RAW_ORDER)
+        cleaned = load_range(conn, ds["cleaned_table"], low, high)
+    finally:
+        conn.close()
+
+    # Même ordre de déduplication que le nettoyage : doublons exacts puis doublons de clé
+    hashes = raw["row_hash"].to_numpy(dtype=np.uint64) if raw["row_hash"].notna().all() else row_hashes(raw)
+    exact = pd.Series(hashes, index=raw.index).duplicated().to_numpy()
+    kept = raw[~exact]
+    key_dupes = kept[KEY].duplicated().to_numpy()
+    dropped = pd.concat([
+        raw[exact].assign(dropped_by="deduplication_exact"),
+        kept[key_dupes].assign(dropped_by="deduplication_id"),
+    ]).drop(columns=["row_hash"])
+    kept = kept[~key_dupes]
+
+    merged = kept.drop(columns=["row_hash"]).merge(
+        cleaned, on=KEY, how="outer", suffixes=("_raw", "_clean"), indicator=True, sort=True
+    )
+    both = merged[merged["_merge"] == "both"]
+    stats = {
+        "rows_raw": len(raw),
+        "rows_cleaned": len(cleaned),
+        "matched": len(both),
+        "dropped_exact": int(exact.sum()),
+        "dropped_key": int(key_dupes.sum()),
+        "missing_in_cleaned": int((merged["_merge"] == "left_only").sum()),
+        "extra_in_cleaned": int((merged["_merge"] == "right_only").sum()),
+        "rows_changed": 0,
+        "columns": {},
+    }
+    any_change = np.zeros(len(both), dtype=bool)
+    for column in COLUMNS:
+        before, after = both[f"{column}_raw"].reset_index(drop=True), both[f"{column}_clean"].reset_index(drop=True)
+        types, changed = classify(column, before, after)
+        if types:
+            stats["columns"][column] = Counter(types)
+            any_change |= changed
+    stats["rows_changed"] = int(any_change.sum())
+    return stats, dropped
+
+
+def merge_stats(total, part):
+    for key, value in part.items():
+        if key == "columns":
+            for column, types in value.items():
+                total["columns"].setdefault(column, Counter()).update(types)
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def run_diff(partition_size=50000, workers=4, dataset=DEFAULT_DATASET):
+    ds = get_dataset(dataset)
+    print("=" * 60)
+    print(f"DIFFÉRENTIEL {ds['raw_table']} -> {ds['cleaned_table']}")
+    print("=" * 60)
+    start = time.perf_counter()
+
+    conn = pymysql.connect(**DB_CONFIG)
+    ranges = id_ranges(conn, ds, partition_size)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {ds['raw_table']} WHERE {KEY} IS NULL")
+    null_keys = cursor.fetchone()[0]
+    conn.close()
+    print(f"\n[1/2] {len(ranges)} plages de {partition_size} clés, {workers} workers...")
+
+    dropped_path = os.path.join(REPORT_DIR, report_name(ds, "diff_dropped_rows.csv"))
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    total = {"columns": {}}
+    header = True
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(dropped_path, "w", encoding="utf-8", newline="") as out:
+        # Au plus 2 plages en cours par worker : la mémoire ne dépend pas du nombre de plages
+        pending, queued, done = set(), iter(ranges), 0
+        while True:
+            for low, high in queued:
+                pending.add(pool.submit(diff_range, ds, low, high))
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stats, dropped = future.result()
+                merge_stats(total, stats)
+                # Écriture au fil de l'eau : seules les lignes des plages en cours sont en mémoire
+                if len(dropped):
+                    dropped.to_csv(out, index=False, header=header)
+                    header = False
+                done += 1
+                if done % 10 == 0 or done == len(ranges):
+                    print(f"  {done} / {len(ranges)} plages")
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "dataset": ds["name"],
+        "partitions": len(ranges),
+        "partition_size": partition_size,
+        "null_keys_in_raw": int(null_keys),
+        **{k: v for k, v in total.items() if k != "columns"},
+        "columns": {c: {"changed": sum(t.values()), "types": dict(t)} for c, t in sorted(total["columns"].items())},
+        "dropped_rows_csv": dropped_path,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+    }
+
+    print("\n[2/2] Résultats :")
+    print(f"  - {report.get('rows_raw', 0)} lignes brutes, {report.get('rows_cleaned', 0)} nettoyées, "
+          f"{report.get('matched', 0)} appariées, {report.get('rows_changed', 0)} modifiées")
+    print(f"  - Supprimées : {report.get('dropped_exact', 0)} doublons exacts, "
+          f"{report.get('dropped_key', 0)} doublons de clé ({dropped_path})")
+    for column, detail in report["columns"].items():
+        types = ", ".join(f"{k}={v}" for k, v in detail["types"].items())
+        print(f"  - {column:<17} {detail['changed']:>6} ({types})")
+
+    json_path = os.path.join(REPORT_DIR, report_name(ds, "diff_report.json"))
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"\nRapport JSON : {json_path} ({report['elapsed_s']}s)")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Différentiel par clé entre tables brute et nettoyée")
+    parser.add_argument("--partition-size", type=int, default=50000, help="Nb de Transaction_ID par plage")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--profile", action="store_true", help="Profil CPU/allocations dans reports/profiles/")
+    args = parser.parse_args()
+    with profiled(f"diff_{args.dataset}", args.profile):
+        run_diff(args.partition_size, args.workers, args.dataset)
@@ -1,15 +1,35 @@
 """
 Moniteur d'alertes Data Quality
 Verifie quotidiennement si le score DQ est au dessus du seuil (90%)
-Usage: python scripts/dq_alert_monitor.py
+Canal performance : duree, volume et debit de chaque etape (pipeline_runs)
+compares a la mediane des executions precedentes et aux SLO
+Usage: python scripts/dq_alert_monitor.py [--dataset retail] [--channel all|quality|performance]
 """
 import pymysql
+import argparse
 import json
 import os
 from datetime import datetime
+from statistics import median
 
 # Configuration
 THRESHOLD = 90.0
+LOG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "dq_alerts.json")
+
+# Canal performance
+BASELINE_RUNS = 14          # executions reussies precedentes formant la reference
+THROUGHPUT_DROP = 0.5       # alerte si debit < 50% de la mediane
+DURATION_FACTOR = 3.0       # alerte si duree > 3x la mediane
+VOLUME_DROP = 0.5           # alerte si lignes traitees < 50% de la mediane
+STAGE_SLO_SECONDS = {       # duree maximale par etape (fenetre nocturne de 02:00)
+    "import": 300,
+    "clean": 600,
+    "validate": 600,
+    "kpis": 120,
+    "job": 1800,
+    "stream_batch": 10,
+}
+
 DB_CONFIG = {
     "host": "localhost",
     "port": 3307,
@@ -18,7 +38,7 @@ DB_CONFIG = {
     "database": "data_quality"
 }
 
-def check_quality_score():
+def check_quality_score(dataset="retail"):
     """Verifie le score de qualite et declenche une alerte si necessaire"""
     conn = pymysql.connect(**DB_CONFIG)
     cur = conn.cursor()
@@ -35,9 +55,10 @@ def check_quality_score():
             timeliness,
             (completeness + accuracy + uniqueness + validity + consistency + timeliness) / 6.0 as global_score
         FROM quality_scores_history 
+        WHERE dataset = %s
         ORDER BY report_date DESC 
         LIMIT 1
-    """)
+    """, (dataset,))
     result = cur.fetchone()
     conn.close()
     
@@ -71,6 +92,8 @@ def check_quality_score():
     
     alert = {
         "timestamp": datetime.now().isoformat(),
+        "channel": "quality",
+        "dataset": dataset,
         "global_score": round(global_score, 2),
         "threshold": THRESHOLD,
         "status": "OK" if global_score >= THRESHOLD else "ALERTE",
@@ -88,14 +111,16 @@ def check_quality_score():
     else:
         print(f"\n  Status: OK - Score au dessus du seuil")
     
-    # Save alert log
-    log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(log_dir, "dq_alerts.json")
+    save_alert(alert)
+    return alert
+
+def save_alert(alert):
+    """Ajoute une alerte (tous canaux) au journal logs/dq_alerts.json"""
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
     
     alerts = []
-    if os.path.exists(log_file):
-        with open(log_file, "r", encoding="utf-8") as f:
+    if os.path.exists(LOG_FILE):
+        with open(LOG_FILE, "r", encoding="utf-8") as f:
             try:
                 alerts = json.load(f)
             except:
@@ -103,12 +128,132 @@ def check_quality_score():
     
     alerts.append(alert)
     
-    with open(log_file, "w", encoding="utf-8") as f:
+    with open(LOG_FILE, "w", encoding="utf-8") as f:
         json.dump(alerts, f, indent=2, ensure_ascii=False)
     
-    print(f"\n  Log sauvegarde: {log_file}")
+    print(f"\n  Log sauvegarde: {LOG_FILE}")
     print(f"{'='*50}\n")
+
+def stage_history(dataset):
+    """Par etape : derniere execution puis jusqu'a BASELINE_RUNS reussites precedentes, (duree, lignes, statut, debut)"""
+    conn = pymysql.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    # Le classement et le filtre des reussites sont faits en SQL : la reference compte
+    # BASELINE_RUNS reussites meme si des echecs s'intercalent, sans lire tout l'historique
+    cur.execute("""
+        WITH ranked AS (
+            SELECT stage, duration_s, rows_processed, status, started_at,
+                   ROW_NUMBER() OVER (PARTITION BY stage ORDER BY started_at DESC, id DESC) AS rn
+            FROM pipeline_runs
+            WHERE dataset = %s
+        ), baseline AS (
+            SELECT stage, duration_s, rows_processed, status, started_at,
+                   ROW_NUMBER() OVER (PARTITION BY stage ORDER BY rn) AS position
+            FROM ranked
+            WHERE rn > 1 AND status = 'success'
+        )
+        SELECT stage, duration_s, rows_processed, status, started_at, 0 AS position
+        FROM ranked WHERE rn = 1
+        UNION ALL
+        SELECT stage, duration_s, rows_processed, status, started_at, position
+        FROM baseline WHERE position <= %s
+        ORDER BY stage, position
+    """, (dataset, BASELINE_RUNS))
+    history = {}
+    for stage, duration, rows, status, started_at, _ in cur.fetchall():
+        history.setdefault(stage, []).append(
+            (float(duration), None if rows is None else int(rows), status, started_at))
+    conn.close()
+    return history
+
+def evaluate_stage(stage, runs):
+    """Compare la derniere execution d'une etape a sa reference ; retourne (mesures, problemes)"""
+    duration, rows, status, started_at = runs[0]
+    throughput = rows / duration if rows and duration > 0 else None
+    baseline = [r for r in runs[1:] if r[2] == "success"]
+    result = {
+        "stage": stage,
+        "started_at": str(started_at),
+        "status": status,
+        "duration_s": round(duration, 3),
+        "rows": rows,
+        "throughput_rps": None if throughput is None else round(throughput, 1),
+        "baseline_runs": len(baseline),
+    }
+    issues = []
+    if status != "success":
+        issues.append(f"derniere execution en echec ({status})")
+    slo = STAGE_SLO_SECONDS.get(stage)
+    if slo is not None and duration > slo:
+        issues.append(f"SLO depasse : {duration:.1f}s > {slo}s")
+
+    if baseline:
+        base_duration = median(r[0] for r in baseline)
+        result["baseline_duration_s"] = round(base_duration, 3)
+        if base_duration > 0 and duration > DURATION_FACTOR * base_duration:
+            issues.append(f"duree x{duration / base_duration:.1f} par rapport a la mediane ({base_duration:.1f}s)")
+        base_rows = [r[1] for r in baseline if r[1]]
+        if base_rows and rows is not None:
+            result["baseline_rows"] = median(base_rows)
+            if rows < VOLUME_DROP * result["baseline_rows"]:
+                issues.append(f"volume {rows} lignes < {VOLUME_DROP:.0%} de la mediane ({result['baseline_rows']:.0f})")
+        base_tput = [r[1] / r[0] for r in baseline if r[1] and r[0] > 0]
+        if base_tput and throughput is not None:
+            result["baseline_throughput_rps"] = round(median(base_tput), 1)
+            if throughput < THROUGHPUT_DROP * median(base_tput):
+                issues.append(f"debit {throughput:.0f} l/s < {THROUGHPUT_DROP:.0%} de la mediane "
+                              f"({median(base_tput):.0f} l/s)")
+    result["issues"] = issues
+    return result, issues
+
+def check_performance(dataset="retail"):
+    """Canal performance : regressions de debit, de volume et depassements de SLO par etape"""
+    history = stage_history(dataset)
+    
+    now = datetime.now().strftime('%Y-%m-%d %H:%M')
+    print(f"\n{'='*50}")
+    print(f"  MONITEUR PERFORMANCE DU PIPELINE")
+    print(f"  {now}")
+    print(f"{'='*50}")
+    
+    if not history:
+        print("[WARN] Aucune execution trouvee dans pipeline_runs")
+        return None
+    
+    stages = []
+    for stage, runs in history.items():
+        result, issues = evaluate_stage(stage, runs)
+        stages.append(result)
+        tput = f"{result['throughput_rps']} l/s" if result["throughput_rps"] is not None else "-"
+        print(f"    [{'!!' if issues else 'OK'}] {stage}: {result['duration_s']}s, {result['rows']} lignes, {tput}")
+        for issue in issues:
+            print(f"         - {issue}")
+    
+    degraded = [s["stage"] for s in stages if s["issues"]]
+    alert = {
+        "timestamp": datetime.now().isoformat(),
+        "channel": "performance",
+        "dataset": dataset,
+        "status": "ALERTE" if degraded else "OK",
+        "degraded_stages": degraded,
+        "stages": stages,
+    }
+    
+    if degraded:
+        print(f"\n  *** ALERTE PERFORMANCE: {', '.join(degraded)} ***")
+        print(f"  Action: Profiler l'etape (--profile) et verifier le volume des donnees.")
+    else:
+        print(f"\n  Status: OK - Performances conformes a la reference")
+    
+    save_alert(alert)
     return alert
 
 if __name__ == "__main__":
-    check_quality_score()
+    parser = argparse.ArgumentParser(description="Alertes qualite et performance du pipeline")
+    parser.add_argument("--dataset", default="retail")
+    parser.add_argument("--channel", choices=["all", "quality", "performance"], default="all")
+    args = parser.parse_args()
+    if args.channel in ("all", "quality"):
+        check_quality_score(args.dataset)
+    if args.channel in ("all", "performance"):
+        check_performance(args.dataset)
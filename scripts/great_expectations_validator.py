@@ -3,16 +3,20 @@ Great Expectations Validator - Phase 4
 Validation automatisée de la qualité des données retail_cleaned
 Couvre les 6 piliers : Complétude, Exactitude, Validité, Unicité, Cohérence, Actualité
 Génère un rapport HTML (Data Docs) dans great_expectations/data_docs/
+Usage: python scripts/great_expectations_validator.py [--incremental [--verify]] [--fast-startup]
 """
-import great_expectations as gx
-from great_expectations.core.expectation_suite import ExpectationSuite
-from great_expectations.expectations.expectation import Expectation
 import pandas as pd
 import pymysql
+import argparse
+import hashlib
 import json
 import os
 import sys
+import time
 from datetime import datetime
+from datasets import DEFAULT_DATASET, get_dataset, report_name
+from pipeline_metrics import stage_timer
+from profiling import profiled
 
 # === CONFIG ===
 DB_HOST = "localhost"
@@ -22,199 +26,282 @@ DB_PASSWORD = "dq_password"
 DB_NAME = "data_quality"
 PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 GE_DIR = os.path.join(PROJECT_DIR, "great_expectations")
-SUITE_NAME = "retail_quality_suite"
+# Format de la suite persistée (--fast-startup) : l'id E1..E15 est porté par meta["dq_id"]
+SUITE_FORMAT = 2
 
-def load_data():
+PILLAR_HEADERS = {
+    "Complétude": "📋 PILIER 1 : COMPLÉTUDE",
+    "Exactitude": "🎯 PILIER 2 : EXACTITUDE",
+    "Validité": "✔️  PILIER 3 : VALIDITÉ",
+    "Unicité": "🔑 PILIER 4 : UNICITÉ",
+    "Cohérence": "🔗 PILIER 5 : COHÉRENCE",
+    "Actualité": "🕐 PILIER 6 : ACTUALITÉ",
+}
+
+def expectation_specs():
+    """Définition des 15 expectations couvrant les 6 piliers (type GX + paramètres)"""
+    return [
+        # PILIER 1 : COMPLÉTUDE (3 expectations)
+        {"id": "E1", "pillar": "Complétude", "description": "Transaction_ID non null",
+         "label": "Transaction_ID non null ",
+         "type": "ExpectColumnValuesToNotBeNull", "kwargs": {"column": "Transaction_ID"}},
+        {"id": "E2", "pillar": "Complétude", "description": "Product_Name non null",
+         "label": "Product_Name non null   ",
+         "type": "ExpectColumnValuesToNotBeNull", "kwargs": {"column": "Product_Name"}},
+        {"id": "E3", "pillar": "Complétude", "description": "Transaction_Date non null",
+         "label": "Transaction_Date non null",
+         "type": "ExpectColumnValuesToNotBeNull", "kwargs": {"column": "Transaction_Date"}},
+        # PILIER 2 : EXACTITUDE (2 expectations)
+        {"id": "E4", "pillar": "Exactitude", "description": "Customer_ID format CUST-XXXX",
+         "label": "Customer_ID format      ",
+         "type": "ExpectColumnValuesToMatchRegex", "kwargs": {"column": "Customer_ID", "regex": r"^CUST-\d{4}$"}},
+        {"id": "E5", "pillar": "Exactitude", "description": "Customer_Name longueur >= 2",
+         "label": "Customer_Name longueur  ",
+         "type": "ExpectColumnValueLengthsToBeBetween", "kwargs": {"column": "Customer_Name", "min_value": 2}},
+        # PILIER 3 : VALIDITÉ (4 expectations)
+        {"id": "E6", "pillar": "Validité", "description": "Unit_Price > 0",
+         "label": "Unit_Price > 0          ",
+         "type": "ExpectColumnValuesToBeBetween", "kwargs": {"column": "Unit_Price", "min_value": 0.01}},
+        {"id": "E7", "pillar": "Validité", "description": "Quantity >= 1",
+         "label": "Quantity >= 1           ",
+         "type": "ExpectColumnValuesToBeBetween", "kwargs": {"column": "Quantity", "min_value": 1}},
+        {"id": "E8", "pillar": "Validité", "description": "Total_Amount >= 0",
+         "label": "Total_Amount >= 0       ",
+         "type": "ExpectColumnValuesToBeBetween", "kwargs": {"column": "Total_Amount", "min_value": 0.0}},
+        {"id": "E9", "pillar": "Validité", "description": "Payment_Method dans set FR",
+         "label": "Payment_Method valide   ",
+         "type": "ExpectColumnValuesToBeInSet",
+         "kwargs": {"column": "Payment_Method",
+                    "value_set": ["Carte Crédit", "Carte Débit", "PayPal", "Espèces", "Inconnu"]}},
+        # PILIER 4 : UNICITÉ (2 expectations)
+        {"id": "E10", "pillar": "Unicité", "description": "Transaction_ID unique",
+         "label": "Transaction_ID unique  ",
+         "type": "ExpectColumnValuesToBeUnique", "kwargs": {"column": "Transaction_ID"}},
+        {"id": "E11", "pillar": "Unicité", "description": "Nombre colonnes = 11",
+         "label": "Nb colonnes = 11       ",
+         "type": "ExpectTableColumnCountToEqual", "kwargs": {"value": 11}},
+        # PILIER 5 : COHÉRENCE (2 expectations)
+        {"id": "E12", "pillar": "Cohérence", "description": "Nb lignes >= 10 000",
+         "label": "Nb lignes >= 10 000    ",
+         "type": "ExpectTableRowCountToBeBetween", "kwargs": {"min_value": 10000}},
+        {"id": "E13", "pillar": "Cohérence", "description": "Product_Category dans set FR",
+         "label": "Product_Category valide",
+         "type": "ExpectColumnValuesToBeInSet",
+         "kwargs": {"column": "Product_Category", "value_set": ["Électronique", "Vêtements", "Autre", "Beauté"]}},
+        # PILIER 6 : ACTUALITÉ (2 expectations)
+        {"id": "E14", "pillar": "Actualité", "description": "Dates pas dans le futur",
+         "label": "Dates pas futures      ",
+         "type": "ExpectColumnValuesToBeBetween",
+         "kwargs": {"column": "Transaction_Date", "max_value": {"$PARAMETER": "today"}}},
+        {"id": "E15", "pillar": "Actualité", "description": "Dates après 2020-01-01",
+         "label": "Dates après 2020       ",
+         "type": "ExpectColumnValuesToBeBetween",
+         "kwargs": {"column": "Transaction_Date", "min_value": "2020-01-01"}},
+    ]
+
+def suite_parameters():
+    """Valeurs des paramètres de suite résolus à chaque exécution"""
+    return {"today": datetime.now().strftime("%Y-%m-%d")}
+
+def resolve_specs(specs, parameters):
+    """Remplace les {"$PARAMETER": nom} par leur valeur pour l'exécution courante"""
+    def resolve(value):
+        if isinstance(value, dict) and "$PARAMETER" in value:
+            return parameters[value["$PARAMETER"]]
+        return value
+    return [{**spec, "kwargs": {k: resolve(v) for k, v in spec["kwargs"].items()}} for spec in specs]
+
+def suite_definition_hash(specs):
+    """Empreinte de la définition de la suite (types + paramètres non résolus)"""
+    payload = json.dumps([SUITE_FORMAT] + [(s["id"], s["type"], s["kwargs"]) for s in specs],
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def gx_names(ds):
+    """Noms GX du dataset (suite, datasource, asset, batch), contexte fichier et export de la suite.
+
+    Chaque dataset a son propre contexte fichier : les validations concurrentes de
+    multi_dataset_runner.py ne réécrivent pas le même great_expectations.yml.
+    """
+    if ds["name"] == DEFAULT_DATASET:
+        context_root, export_dir = PROJECT_DIR, GE_DIR
+    else:
+        context_root = export_dir = os.path.join(GE_DIR, "contexts", ds["name"])
+    return {
+        "suite": ds["suite"],
+        "suite_path": os.path.join(export_dir, "expectations", f"{ds['suite']}.json"),
+        "context_root": context_root,
+        "datasource": f"{ds['table_prefix']}_pandas_ds",
+        "asset": f"{ds['cleaned_table']}_asset",
+        "batch": f"{ds['table_prefix']}_batch",
+    }
+
+def import_gx(timings):
+    """Import différé de great_expectations (plusieurs secondes), chronométré à part"""
+    start = time.perf_counter()
+    import great_expectations as gx
+    timings["import_s"] = round(time.perf_counter() - start, 3)
+    return gx
+
+def load_data(table="retail_cleaned"):
     """Charge les données depuis MariaDB"""
     print("📊 Chargement des données depuis MariaDB...")
     conn = pymysql.connect(host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, database=DB_NAME)
-    df = pd.read_sql("SELECT * FROM retail_cleaned", conn)
+    df = pd.read_sql(f"SELECT * FROM {table}", conn)
     conn.close()
     print(f"   → {len(df)} lignes, {len(df.columns)} colonnes chargées")
     return df
 
-def run_validation():
-    """Exécute les 15 expectations couvrant les 6 piliers"""
-    df = load_data()
-    
-    print("\n" + "="*60)
-    print("🔍 VALIDATION GREAT EXPECTATIONS - PHASE 4")
-    print("="*60)
+def print_results(specs, successes):
+    """Affiche les résultats groupés par pilier"""
+    current_pillar = None
+    for spec in specs:
+        if spec["pillar"] != current_pillar:
+            current_pillar = spec["pillar"]
+            print(f"\n{PILLAR_HEADERS[current_pillar]}")
+            print("-" * 40)
+        success = successes[spec["id"]]
+        print(f"   {spec['id']}. {spec['label']}: {'✅ PASS' if success else '❌ FAIL'}")
 
-    # === SETUP GX CONTEXT ===
-    context = gx.get_context()
+def build_context(gx, specs, names):
+    """Contexte éphémère : suite et datasource recréées à chaque exécution"""
+    from great_expectations.core.expectation_suite import ExpectationSuite
+
+    # Éphémère explicitement : sans mode, GX reprendrait le contexte fichier gx/ du répertoire
+    # courant et y écraserait la suite persistée
+    context = gx.get_context(mode="ephemeral")
     
     # Delete existing suite if it exists
     try:
-        context.suites.delete(SUITE_NAME)
+        context.suites.delete(names["suite"])
     except:
         pass
     
-    suite = context.suites.add(ExpectationSuite(name=SUITE_NAME))
+    suite = context.suites.add(ExpectationSuite(name=names["suite"]))
+    for spec in specs:
+        suite.add_expectation(getattr(gx.expectations, spec["type"])(**spec["kwargs"]))
     
     # Create datasource and batch
-    ds_name = "retail_pandas_ds"
     try:
-        context.data_sources.delete(ds_name)
+        context.data_sources.delete(names["datasource"])
     except:
         pass
     
-    datasource = context.data_sources.add_pandas(name=ds_name)
-    data_asset = datasource.add_dataframe_asset(name="retail_cleaned_asset")
-    batch_definition = data_asset.add_batch_definition_whole_dataframe("retail_batch")
+    datasource = context.data_sources.add_pandas(name=names["datasource"])
+    data_asset = datasource.add_dataframe_asset(name=names["asset"])
+    return data_asset.add_batch_definition_whole_dataframe(names["batch"])
+
+def persistent_context(gx, specs, names):
+    """Contexte fichier (gx/ du dataset) réutilisé d'une exécution à l'autre.
+
+    La suite et la datasource ne sont reconstruites que si la définition de la suite
+    a changé depuis le dernier build (definition_hash enregistré dans le meta de la suite).
+    La suite garde ses paramètres non résolus ({"$PARAMETER": "today"}).
+    Retourne (batch_definition, suite, reconstruit ?).
+    """
+    os.makedirs(names["context_root"], exist_ok=True)
+    context = gx.get_context(mode="file", project_root_dir=names["context_root"])
+    definition_hash = suite_definition_hash(specs)
+    try:
+        suite = context.suites.get(names["suite"])
+        if (suite.meta or {}).get("definition_hash") == definition_hash:
+            asset = context.data_sources.get(names["datasource"]).get_asset(names["asset"])
+            return asset.get_batch_definition(names["batch"]), suite, False
+    except Exception:
+        pass
+
+    from great_expectations.core.expectation_suite import ExpectationSuite
+
+    try:
+        context.suites.delete(names["suite"])
+    except Exception:
+        pass
+    suite = context.suites.add(ExpectationSuite(name=names["suite"], meta={"definition_hash": definition_hash}))
+    for spec in specs:
+        suite.add_expectation(getattr(gx.expectations, spec["type"])(**spec["kwargs"], meta={"dq_id": spec["id"]}))
+    try:
+        context.data_sources.delete(names["datasource"])
+    except Exception:
+        pass
+    asset = context.data_sources.add_pandas(name=names["datasource"]).add_dataframe_asset(name=names["asset"])
+    return asset.add_batch_definition_whole_dataframe(names["batch"]), suite, True
+
+def validate_with_gx(specs, df, names, fast_startup=False, timings=None):
+    """Évalue chaque expectation avec Great Expectations sur le DataFrame complet"""
+    timings = {} if timings is None else timings
+    gx = import_gx(timings)
+
+    # === SETUP GX CONTEXT ===
+    start = time.perf_counter()
+    if fast_startup:
+        batch_definition, suite, rebuilt = persistent_context(gx, specs, names)
+        print(f"   Contexte GX persistant : {'suite reconstruite' if rebuilt else 'suite réutilisée'}")
+    else:
+        batch_definition = build_context(gx, resolve_specs(specs, suite_parameters()), names)
     batch = batch_definition.get_batch(batch_parameters={"dataframe": df})
+    timings["startup_s"] = round(time.perf_counter() - start, 3)
 
-    results = []
-    
-    # ============================================================
-    # PILIER 1 : COMPLÉTUDE (3 expectations)
-    # ============================================================
-    print("\n📋 PILIER 1 : COMPLÉTUDE")
-    print("-" * 40)
-    
-    # E1: Transaction_ID non null
-    e1 = gx.expectations.ExpectColumnValuesToNotBeNull(column="Transaction_ID")
-    suite.add_expectation(e1)
-    r1 = batch.validate(e1)
-    results.append(("Complétude", "Transaction_ID non null", r1.success))
-    print(f"   E1. Transaction_ID non null : {'✅ PASS' if r1.success else '❌ FAIL'}")
-    
-    # E2: Product_Name non null
-    e2 = gx.expectations.ExpectColumnValuesToNotBeNull(column="Product_Name")
-    suite.add_expectation(e2)
-    r2 = batch.validate(e2)
-    results.append(("Complétude", "Product_Name non null", r2.success))
-    print(f"   E2. Product_Name non null   : {'✅ PASS' if r2.success else '❌ FAIL'}")
-    
-    # E3: Transaction_Date non null
-    e3 = gx.expectations.ExpectColumnValuesToNotBeNull(column="Transaction_Date")
-    suite.add_expectation(e3)
-    r3 = batch.validate(e3)
-    results.append(("Complétude", "Transaction_Date non null", r3.success))
-    print(f"   E3. Transaction_Date non null: {'✅ PASS' if r3.success else '❌ FAIL'}")
+    start = time.perf_counter()
+    successes = {}
+    if fast_startup:
+        # La suite persistée est validée telle quelle, en une passe ; la date du jour est
+        # fournie comme paramètre de suite
+        result = batch.validate(suite, expectation_parameters=suite_parameters())
+        for expectation_result in result.results:
+            successes[expectation_result.expectation_config.meta["dq_id"]] = expectation_result.success
+    else:
+        # Les paramètres de suite (date du jour) sont résolus à l'exécution
+        for spec in resolve_specs(specs, suite_parameters()):
+            expectation = getattr(gx.expectations, spec["type"])(**spec["kwargs"])
+            successes[spec["id"]] = batch.validate(expectation).success
+    timings["validation_s"] = round(time.perf_counter() - start, 3)
+    return successes
 
-    # ============================================================
-    # PILIER 2 : EXACTITUDE (2 expectations)
-    # ============================================================
-    print("\n🎯 PILIER 2 : EXACTITUDE")
-    print("-" * 40)
-    
-    # E4: Customer_ID format CUST-XXXX
-    e4 = gx.expectations.ExpectColumnValuesToMatchRegex(column="Customer_ID", regex=r"^CUST-\d{4}$")
-    suite.add_expectation(e4)
-    r4 = batch.validate(e4)
-    results.append(("Exactitude", "Customer_ID format CUST-XXXX", r4.success))
-    print(f"   E4. Customer_ID format      : {'✅ PASS' if r4.success else '❌ FAIL'}")
-    
-    # E5: Customer_Name longueur min 2 caractères
-    e5 = gx.expectations.ExpectColumnValueLengthsToBeBetween(column="Customer_Name", min_value=2)
-    suite.add_expectation(e5)
-    r5 = batch.validate(e5)
-    results.append(("Exactitude", "Customer_Name longueur >= 2", r5.success))
-    print(f"   E5. Customer_Name longueur  : {'✅ PASS' if r5.success else '❌ FAIL'}")
+def run_validation(incremental=False, verify=False, fast_startup=False, dataset=DEFAULT_DATASET):
+    """Exécute les 15 expectations couvrant les 6 piliers"""
+    ds = get_dataset(dataset)
+    with stage_timer(ds["name"], "validate") as run:
+        success, run["rows"], run["score"] = _run_validation(ds, incremental, verify, fast_startup)
+    return success
 
-    # ============================================================
-    # PILIER 3 : VALIDITÉ (4 expectations)
-    # ============================================================
-    print("\n✔️  PILIER 3 : VALIDITÉ")
-    print("-" * 40)
-    
-    # E6: Unit_Price > 0
-    e6 = gx.expectations.ExpectColumnValuesToBeBetween(column="Unit_Price", min_value=0.01)
-    suite.add_expectation(e6)
-    r6 = batch.validate(e6)
-    results.append(("Validité", "Unit_Price > 0", r6.success))
-    print(f"   E6. Unit_Price > 0          : {'✅ PASS' if r6.success else '❌ FAIL'}")
-    
-    # E7: Quantity >= 1
-    e7 = gx.expectations.ExpectColumnValuesToBeBetween(column="Quantity", min_value=1)
-    suite.add_expectation(e7)
-    r7 = batch.validate(e7)
-    results.append(("Validité", "Quantity >= 1", r7.success))
-    print(f"   E7. Quantity >= 1           : {'✅ PASS' if r7.success else '❌ FAIL'}")
-    
-    # E8: Total_Amount >= 0
-    e8 = gx.expectations.ExpectColumnValuesToBeBetween(column="Total_Amount", min_value=0.0)
-    suite.add_expectation(e8)
-    r8 = batch.validate(e8)
-    results.append(("Validité", "Total_Amount >= 0", r8.success))
-    print(f"   E8. Total_Amount >= 0       : {'✅ PASS' if r8.success else '❌ FAIL'}")
-    
-    # E9: Payment_Method dans les valeurs françaises autorisées
-    valid_payments = ["Carte Crédit", "Carte Débit", "PayPal", "Espèces", "Inconnu"]
-    e9 = gx.expectations.ExpectColumnValuesToBeInSet(column="Payment_Method", value_set=valid_payments)
-    suite.add_expectation(e9)
-    r9 = batch.validate(e9)
-    results.append(("Validité", "Payment_Method dans set FR", r9.success))
-    print(f"   E9. Payment_Method valide   : {'✅ PASS' if r9.success else '❌ FAIL'}")
+def _run_validation(ds, incremental, verify, fast_startup):
+    names = gx_names(ds)
+    specs = expectation_specs()
+    cache_stats = None
+    timings = {}
 
-    # ============================================================
-    # PILIER 4 : UNICITÉ (2 expectations)
-    # ============================================================
-    print("\n🔑 PILIER 4 : UNICITÉ")
-    print("-" * 40)
-    
-    # E10: Transaction_ID unique (Clé primaire)
-    e10 = gx.expectations.ExpectColumnValuesToBeUnique(column="Transaction_ID")
-    suite.add_expectation(e10)
-    r10 = batch.validate(e10)
-    results.append(("Unicité", "Transaction_ID unique", r10.success))
-    print(f"   E10. Transaction_ID unique  : {'✅ PASS' if r10.success else '❌ FAIL'}")
+    if incremental:
+        from validation_cache import validate_incremental
+        conn = pymysql.connect(host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, database=DB_NAME)
+        successes, row_count, cache_stats = validate_incremental(
+            conn, resolve_specs(specs, suite_parameters()), table=ds["cleaned_table"]
+        )
+        conn.close()
+        if verify:
+            # Référence : la suite GX complète sur toute la table, comparée expectation par expectation
+            print("🔁 Vérification contre une validation GX complète...")
+            full = validate_with_gx(specs, load_data(ds["cleaned_table"]), names, timings=timings)
+            mismatches = [spec["id"] for spec in specs if full[spec["id"]] != successes[spec["id"]]]
+            cache_stats["verified"] = not mismatches
+            if mismatches:
+                print(f"   ❌ Écarts avec la validation GX complète : {', '.join(mismatches)}")
+            else:
+                print("   ✅ Résultats identiques à la validation GX complète")
+    else:
+        df = load_data(ds["cleaned_table"])
+        row_count = len(df)
     
-    # E11: Nombre de colonnes attendu (11)
-    e11 = gx.expectations.ExpectTableColumnCountToEqual(value=11)
-    suite.add_expectation(e11)
-    r11 = batch.validate(e11)
-    results.append(("Unicité", "Nombre colonnes = 11", r11.success))
-    print(f"   E11. Nb colonnes = 11       : {'✅ PASS' if r11.success else '❌ FAIL'}")
+    print("\n" + "="*60)
+    print("🔍 VALIDATION GREAT EXPECTATIONS - PHASE 4")
+    print("="*60)
 
-    # ============================================================
-    # PILIER 5 : COHÉRENCE (2 expectations)
-    # ============================================================
-    print("\n🔗 PILIER 5 : COHÉRENCE")
-    print("-" * 40)
-    
-    # E12: Total_Amount cohérent (> Unit_Price dans la majorité)
-    # We check that row count is above a threshold
-    e12 = gx.expectations.ExpectTableRowCountToBeBetween(min_value=10000)
-    suite.add_expectation(e12)
-    r12 = batch.validate(e12)
-    results.append(("Cohérence", "Nb lignes >= 10 000", r12.success))
-    print(f"   E12. Nb lignes >= 10 000    : {'✅ PASS' if r12.success else '❌ FAIL'}")
-    
-    # E13: Product_Category dans les catégories FR connues
-    valid_categories = ["Électronique", "Vêtements", "Autre", "Beauté"]
-    e13 = gx.expectations.ExpectColumnValuesToBeInSet(column="Product_Category", value_set=valid_categories)
-    suite.add_expectation(e13)
-    r13 = batch.validate(e13)
-    results.append(("Cohérence", "Product_Category dans set FR", r13.success))
-    print(f"   E13. Product_Category valide: {'✅ PASS' if r13.success else '❌ FAIL'}")
+    if not incremental:
+        successes = validate_with_gx(specs, df, names, fast_startup=fast_startup, timings=timings)
+        print(f"   ⏱️  import GX {timings['import_s']}s | démarrage {timings['startup_s']}s | "
+              f"validation {timings['validation_s']}s")
 
-    # ============================================================
-    # PILIER 6 : ACTUALITÉ (2 expectations)
-    # ============================================================
-    print("\n🕐 PILIER 6 : ACTUALITÉ")
-    print("-" * 40)
-    
-    # E14: Transaction_Date pas dans le futur
-    e14 = gx.expectations.ExpectColumnValuesToBeBetween(
-        column="Transaction_Date",
-        max_value=datetime.now().strftime("%Y-%m-%d")
-    )
-    suite.add_expectation(e14)
-    r14 = batch.validate(e14)
-    results.append(("Actualité", "Dates pas dans le futur", r14.success))
-    print(f"   E14. Dates pas futures      : {'✅ PASS' if r14.success else '❌ FAIL'}")
-    
-    # E15: Transaction_Date après 2020 (pas trop anciennes)
-    e15 = gx.expectations.ExpectColumnValuesToBeBetween(
-        column="Transaction_Date",
-        min_value="2020-01-01"
-    )
-    suite.add_expectation(e15)
-    r15 = batch.validate(e15)
-    results.append(("Actualité", "Dates après 2020-01-01", r15.success))
-    print(f"   E15. Dates après 2020       : {'✅ PASS' if r15.success else '❌ FAIL'}")
+    print_results(specs, successes)
+    results = [(spec["pillar"], spec["description"], successes[spec["id"]]) for spec in specs]
 
     # ============================================================
     # RÉSUMÉ
@@ -245,8 +332,8 @@ def run_validation():
     # === SAVE RESULTS AS JSON REPORT ===
     report = {
         "run_date": datetime.now().isoformat(),
-        "dataset": "retail_cleaned",
-        "total_rows": len(df),
+        "dataset": ds["cleaned_table"],
+        "total_rows": row_count,
         "total_expectations": total,
         "passed": passed,
         "failed": failed,
@@ -256,20 +343,23 @@ def run_validation():
             for p, d, s in results
         ]
     }
+    if cache_stats:
+        report["partition_cache"] = cache_stats
+    if timings:
+        report["timings"] = timings
     
     # Save to great_expectations/
     os.makedirs(GE_DIR, exist_ok=True)
-    report_path = os.path.join(GE_DIR, "validation_report.json")
+    report_path = os.path.join(GE_DIR, report_name(ds, "validation_report.json"))
     with open(report_path, "w", encoding="utf-8") as f:
         json.dump(report, f, indent=2, ensure_ascii=False)
     print(f"\n📄 Rapport JSON sauvegardé : {report_path}")
     
     # Save expectations suite
-    expectations_dir = os.path.join(GE_DIR, "expectations")
-    os.makedirs(expectations_dir, exist_ok=True)
-    suite_path = os.path.join(expectations_dir, f"{SUITE_NAME}.json")
+    suite_path = names["suite_path"]
+    os.makedirs(os.path.dirname(suite_path), exist_ok=True)
     suite_export = {
-        "suite_name": SUITE_NAME,
+        "suite_name": names["suite"],
         "created_at": datetime.now().isoformat(),
         "expectations_count": total,
         "expectations": [
@@ -287,15 +377,16 @@ def run_validation():
     print(f"📋 Suite sauvegardée : {suite_path}")
     
     # Generate HTML Report (Data Docs)
-    generate_html_report(report, results, len(df))
+    generate_html_report(report, results, row_count, ds)
     
     global_success = failed == 0
     print(f"\n{'✅ VALIDATION GLOBALE : SUCCÈS' if global_success else '⚠️ VALIDATION GLOBALE : CERTAINES RULES ÉCHOUENT'}")
     
-    return global_success
+    return global_success, row_count, (passed / total) * 100
 
-def generate_html_report(report, results, row_count):
+def generate_html_report(report, results, row_count, ds=None):
     """Génère un rapport HTML similaire aux Data Docs de GX"""
+    ds = ds or get_dataset(DEFAULT_DATASET)
     
     data_docs_dir = os.path.join(GE_DIR, "data_docs")
     os.makedirs(data_docs_dir, exist_ok=True)
@@ -368,7 +459,7 @@ def generate_html_report(report, results, row_count):
 <body>
     <div class="header">
         <h1>🔍 Great Expectations - Data Docs</h1>
-        <p>Rapport de Validation Automatisée — retail_cleaned</p>
+        <p>Rapport de Validation Automatisée — {ds["cleaned_table"]}</p>
         <p>Généré le {datetime.now().strftime("%d/%m/%Y à %H:%M")}</p>
     </div>
     
@@ -405,12 +496,24 @@ def generate_html_report(report, results, row_count):
 </body>
 </html>"""
     
-    html_path = os.path.join(data_docs_dir, "validation_report.html")
+    html_path = os.path.join(data_docs_dir, report_name(ds, "validation_report.html"))
     with open(html_path, "w", encoding="utf-8") as f:
         f.write(html)
     print(f"🌐 Data Docs HTML : {html_path}")
 
 if __name__ == "__main__":
-    success = run_validation()
+    parser = argparse.ArgumentParser(description="Validation Great Expectations de retail_cleaned")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Réutilise les résultats partiels des partitions inchangées")
+    parser.add_argument("--verify", action="store_true",
+                        help="Avec --incremental : compare à une validation GX complète")
+    parser.add_argument("--fast-startup", action="store_true",
+                        help="Réutilise le contexte GX fichier et la suite tant que leur définition ne change pas")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--profile", action="store_true", help="Profil CPU/allocations dans reports/profiles/")
+    args = parser.parse_args()
+    with profiled(f"validate_{args.dataset}", args.profile):
+        success = run_validation(incremental=args.incremental, verify=args.verify,
+                                 fast_startup=args.fast_startup, dataset=args.dataset)
     if not success:
         sys.exit(1)
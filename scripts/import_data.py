@@ -1,6 +1,16 @@
 import pandas as pd
 import pymysql
-import numpy as np
+import argparse
+import glob
+import hashlib
+import os
+import sys
+from datasets import DEFAULT_DATASET, get_dataset, ensure_tables
+from pipeline_metrics import stage_timer
+from profiling import profiled
+from data_contract import CHUNK_SIZE, EXIT_CONTRACT_BREACH, ContractViolation, quarantine, read_chunks
+from quality_counters import ensure_counter_tables, reset_counters, record_load
+from row_hash import with_row_hash
 
 DB_HOST = "localhost"
 DB_PORT = 3307
@@ -8,70 +18,145 @@ DB_USER = "dq_user"
 DB_PASSWORD = "dq_password"
 DB_NAME = "data_quality"
 
-CSV_PATH = r"c:\Users\idirt\OneDrive\Bureau\Mabrouk Hannachi\data-quality-pipeline\data\raw\Retail_Store_Sales.csv"
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Fichiers traités par stream_watcher.py (archivés dans data/raw/processed)
+STREAM_ARCHIVE_DIR = os.path.join(PROJECT_DIR, "data", "raw", "processed")
 
-def import_data():
-    print("=" * 60)
-    print("IMPORT DES DONNÉES RETAIL")
-    print("=" * 60)
+def streamed_files(conn, ds, archive_dir=STREAM_ARCHIVE_DIR):
+    """Fichiers du registre stream_ledger pour ce dataset, dans l'ordre de traitement : [chemin]"""
+    cursor = conn.cursor()
+    cursor.execute("SHOW TABLES LIKE 'stream_ledger'")
+    if cursor.fetchone() is None:
+        return []
+    cursor.execute(
+        "SELECT file_sha256, file_name FROM stream_ledger WHERE dataset = %s ORDER BY processed_at, file_sha256",
+        (ds["name"],)
+    )
+    ledger = cursor.fetchall()
+    if not ledger:
+        return []
+    # Le fichier archivé est préfixé d'un horodatage : on le retrouve par son empreinte
+    on_disk = {}
+    for path in glob.glob(os.path.join(archive_dir, "*.csv")):
+        with open(path, "rb") as f:
+            on_disk[hashlib.sha256(f.read()).hexdigest()] = path
+    files = []
+    for digest, name in ledger:
+        if digest in on_disk:
+            files.append(on_disk[digest])
+        else:
+            print(f"  [WARN] Fichier du flux introuvable dans {archive_dir} : {name} ({digest[:12]})")
+    return files
 
-    print("\n[1/3] Chargement du CSV...")
-    df = pd.read_csv(CSV_PATH)
-    print(f"  {len(df)} lignes, {len(df.columns)} colonnes chargées")
-    print(f"  Colonnes : {list(df.columns)}")
+def import_data(dataset=DEFAULT_DATASET, chunk_size=CHUNK_SIZE, stream_dir=STREAM_ARCHIVE_DIR):
+    ds = get_dataset(dataset)
+    breach = None
+    with stage_timer(ds["name"], "import") as run:
+        try:
+            run["rows"] = _import_data(ds, chunk_size, stream_dir)
+        except ContractViolation as e:
+            run["status"] = "contract_breach"
+            breach = e
+        else:
+            if run["rows"] is None:
+                run["status"] = "failed"
+    if breach is not None:
+        raise breach
+    return run["rows"]
 
-    df = df.replace({np.nan: None})
+def _import_data(ds, chunk_size=CHUNK_SIZE, stream_dir=STREAM_ARCHIVE_DIR):
+    raw_table = ds["raw_table"]
+    print("=" * 60)
+    print(f"IMPORT DES DONNÉES {ds['name'].upper()}")
+    print("=" * 60)
 
-    print("\n[2/3] Connexion à MariaDB...")
+    print("\n[1/2] Connexion à MariaDB...")
     try:
         conn = pymysql.connect(
             host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, database=DB_NAME
         )
         cursor = conn.cursor()
+        ensure_tables(conn, ds)
+        ensure_counter_tables(conn)
         print("  Connexion réussie")
     except Exception as e:
         print(f"  ERREUR DE CONNEXION : {e}")
         return
 
-    print("\n[3/3] Insertion dans retail_raw...")
+    print(f"\n[2/2] Chargement de {os.path.basename(ds['csv_path'])} dans {raw_table} "
+          f"(contrat vérifié par morceaux de {chunk_size} lignes)...")
     try:
-        cursor.execute("TRUNCATE TABLE retail_raw")
+        # Une seule transaction : DELETE (et non TRUNCATE, qui valide implicitement) pour qu'une
+        # rupture de contrat restaure la table brute et les compteurs du chargement précédent
+        cursor.execute(f"DELETE FROM {raw_table}")
+        reset_counters(conn, ds)
 
         cols = [
             "Transaction_ID", "Customer_ID", "Customer_Name", "Product_Category",
             "Product_Name", "Unit_Price", "Quantity", "Total_Amount",
-            "Payment_Method", "City", "Transaction_Date"
+            "Payment_Method", "City", "Transaction_Date", "row_hash"
         ]
         placeholders = ", ".join(["%s"] * len(cols))
-        sql = f"INSERT INTO retail_raw ({', '.join(cols)}) VALUES ({placeholders})"
+        sql = f"INSERT INTO {raw_table} ({', '.join(cols)}) VALUES ({placeholders})"
 
         batch_size = 1000
-        batch = []
         count = 0
+        source = os.path.basename(ds["csv_path"])
 
-        for _, row in df.iterrows():
-            values = tuple(row[c] for c in cols)
-            batch.append(values)
+        def insert(chunk, source):
+            # Empreinte calculée une fois à l'import : la déduplication se fait ensuite sur un entier indexé
+            chunk = with_row_hash(chunk)
+            record_load(conn, ds, chunk, source)
+            rows = list(chunk[cols].astype(object).where(chunk[cols].notna(), None)
+                        .itertuples(index=False, name=None))
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(sql, rows[start:start + batch_size])
+            return len(rows)
 
-            if len(batch) >= batch_size:
-                cursor.executemany(sql, batch)
-                conn.commit()
-                count += len(batch)
-                print(f"  {count} / {len(df)} lignes insérées...")
-                batch = []
+        for _, chunk, _ in read_chunks(ds["csv_path"], chunk_size):
+            count += insert(chunk, source)
+            print(f"  {count} lignes insérées...")
 
-        if batch:
-            cursor.executemany(sql, batch)
-            conn.commit()
-            count += len(batch)
-            print(f"  {count} / {len(df)} lignes insérées...")
+        # Les micro-batchs déjà publiés par stream_watcher.py sont rechargés après le CSV
+        # principal, dans leur ordre de traitement et lus comme par le watcher : sans cela,
+        # le DELETE ci-dessus puis le nettoyage nocturne les feraient disparaître
+        streamed = streamed_files(conn, ds, stream_dir)
+        for path in streamed:
+            count += insert(pd.read_csv(path), os.path.basename(path))
+        if streamed:
+            print(f"  {len(streamed)} fichiers du flux rechargés depuis {stream_dir}")
 
-        print(f"  Import terminé : {count} lignes.")
+        conn.commit()
+        print(f"  Import terminé : {count} lignes (compteurs qualité à jour).")
+        return count
 
+    except ContractViolation as e:
+        conn.rollback()
+        path = quarantine(ds, e, ds["csv_path"])
+        print(f"  RUPTURE DE CONTRAT (morceau {e.chunk_index}), import annulé :")
+        for violation in e.violations:
+            print(f"    - {violation}")
+        print(f"  Morceau en quarantaine : {path}")
+        print(f"  {raw_table} conserve le chargement précédent.")
+        raise
     except Exception as e:
+        conn.rollback()
         print(f"  ERREUR D'INSERTION : {e}")
     finally:
         conn.close()
 
 if __name__ == "__main__":
-    import_data()
+    parser = argparse.ArgumentParser(description="Import d'un CSV dans la table brute du dataset")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Lignes par morceau contrôlé")
+    parser.add_argument("--stream-dir", default=STREAM_ARCHIVE_DIR,
+                        help="Archive des fichiers traités par stream_watcher.py (<watch-dir>/processed)")
+    parser.add_argument("--profile", action="store_true", help="Profil CPU/allocations dans reports/profiles/")
+    args = parser.parse_args()
+    try:
+        with profiled(f"import_{args.dataset}", args.profile):
+            count = import_data(args.dataset, args.chunk_size, args.stream_dir)
+    except ContractViolation:
+        sys.exit(EXIT_CONTRACT_BREACH)
+    if count is None:
+        sys.exit(1)
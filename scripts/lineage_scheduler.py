@@ -0,0 +1,243 @@
+"""
+Ordonnanceur piloté par le lignage (governance/data_lineage.json)
+Calcule l'empreinte de chaque dataset du graphe, n'exécute que les processus
+en aval d'un dataset modifié (branches indépendantes en parallèle) et réécrit
+les empreintes et les temps d'exécution dans les métadonnées de lignage.
+Usage: python scripts/lineage_scheduler.py [--dry-run] [--force] [--workers 4]
+"""
+import pymysql
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+# Configuration
+DB_CONFIG = {
+    "host": "localhost",
+    "port": 3307,
+    "user": "dq_user",
+    "password": "dq_password",
+    "database": "data_quality"
+}
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(PROJECT_DIR, "scripts")
+LINEAGE_PATH = os.path.join(PROJECT_DIR, "governance", "data_lineage.json")
+
+# Comment calculer l'empreinte de chaque dataset du graphe
+DATASET_SOURCES = {
+    "source_csv": {"files": [os.path.join(PROJECT_DIR, "data", "raw", "Retail_Store_Sales.csv")]},
+    "retail_raw": {"table": "retail_raw"},
+    "retail_cleaned": {"table": "retail_cleaned"},
+    "quality_reports": {"files": [
+        os.path.join(PROJECT_DIR, "reports", "*.json"),
+        os.path.join(PROJECT_DIR, "reports", "*.csv"),
+        os.path.join(PROJECT_DIR, "great_expectations", "validation_report.json"),
+    ]},
+}
+
+# Commandes de chaque processus, par étapes successives : les commandes d'une même étape
+# sont indépendantes et tournent en parallèle. run_kpis.py attend outlier_detection.py, dont
+# il agrège les métriques Validite (comme calculate_kpis dans le DAG).
+# ok_codes : le validateur sort en 1 si des règles échouent.
+PROCESS_COMMANDS = {
+    "import_job": [[{"script": "import_data.py"}]],
+    "cleaning_job": [[{"script": "cleaning_pipeline.py"}]],
+    "dq_checks": [
+        [
+            {"script": "great_expectations_validator.py", "args": ["--fast-startup"], "ok_codes": [0, 1]},
+            {"script": "outlier_detection.py"},
+        ],
+        [{"script": "run_kpis.py"}],
+    ],
+}
+
+
+def load_lineage():
+    with open(LINEAGE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_lineage(lineage):
+    tmp_path = LINEAGE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(lineage, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, LINEAGE_PATH)
+
+
+def file_fingerprint(patterns):
+    """SHA-256 du contenu des fichiers (triés par chemin)"""
+    digest = hashlib.sha256()
+    paths = sorted(p for pattern in patterns for p in glob.glob(pattern))
+    for path in paths:
+        digest.update(os.path.relpath(path, PROJECT_DIR).encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest() if paths else None
+
+
+def table_fingerprint(table):
+    """CHECKSUM TABLE MariaDB (None si la base est injoignable)"""
+    try:
+        conn = pymysql.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+        cursor.execute(f"CHECKSUM TABLE {table}")
+        row = cursor.fetchone()
+        conn.close()
+        return None if row is None or row[1] is None else str(row[1])
+    except Exception as e:
+        print(f"  [WARN] Empreinte de {table} indisponible : {e}")
+        return None
+
+
+def fingerprint(dataset_id):
+    source = DATASET_SOURCES.get(dataset_id)
+    if source is None:
+        return None
+    if "table" in source:
+        return table_fingerprint(source["table"])
+    return file_fingerprint(source["files"])
+
+
+def run_command(command):
+    """Exécute un script du pipeline et renvoie son bilan"""
+    cmd = [sys.executable, os.path.join(SCRIPTS_DIR, command["script"])] + command.get("args", [])
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=PROJECT_DIR)
+    return {
+        "script": command["script"],
+        "returncode": proc.returncode,
+        "duration_s": round(time.perf_counter() - start, 3),
+        "ok": proc.returncode in command.get("ok_codes", [0]),
+    }
+
+
+def run_process(process_id):
+    """Exécute les étapes d'un processus dans l'ordre ; s'arrête à la première étape en échec"""
+    started_at = datetime.now()
+    start = time.perf_counter()
+    results = []
+    for step in PROCESS_COMMANDS[process_id]:
+        with ThreadPoolExecutor(max_workers=len(step)) as pool:
+            results += list(pool.map(run_command, step))
+        if not all(r["ok"] for r in results):
+            break
+    return {
+        "status": "success" if all(r["ok"] for r in results) else "failed",
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "duration_s": round(time.perf_counter() - start, 3),
+        "commands": results,
+    }
+
+
+def progressed(status, processes, upstream):
+    """Vrai s'il reste un processus dont tout l'amont est décidé"""
+    return any(p not in status and all(u in status for u in upstream[p]) for p in processes)
+
+
+def schedule(lineage, dry_run=False, force=False, workers=4):
+    """Exécute les processus impactés par un changement de dataset, dans l'ordre du graphe"""
+    pipeline = lineage["pipeline"]
+    nodes = {n["id"]: n for n in pipeline["nodes"]}
+    inputs, outputs = defaultdict(list), defaultdict(list)
+    for edge in pipeline["edges"]:
+        outputs[edge["from"]].append(edge["to"])
+        inputs[edge["to"]].append(edge["from"])
+
+    datasets = [n for n, node in nodes.items() if node["type"] == "dataset"]
+    processes = [n for n, node in nodes.items() if node["type"] == "process" and n in PROCESS_COMMANDS]
+    upstream = {p: {u for d in inputs[p] for u in inputs[d] if u in PROCESS_COMMANDS} for p in processes}
+
+    print("\n[1/3] Empreintes des datasets...")
+    current = {d: fingerprint(d) for d in datasets}
+    stored = {d: nodes[d].get("runtime", {}).get("fingerprint") for d in datasets}
+    changed = {d for d in datasets if force or current[d] is None or current[d] != stored[d]}
+    for d in datasets:
+        print(f"  [{'MODIFIÉ' if d in changed else 'inchangé'}] {d}")
+
+    print("\n[2/3] Exécution des processus impactés...")
+    status = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while len(status) < len(processes):
+            for p in processes:
+                if p in status or p in running.values():
+                    continue
+                if not all(u in status for u in upstream[p]):
+                    continue
+                if any(status[u]["status"] in ("failed", "upstream_failed") for u in upstream[p]):
+                    status[p] = {"status": "upstream_failed"}
+                elif not any(d in changed for d in inputs[p]):
+                    status[p] = {"status": "skipped"}
+                elif dry_run:
+                    status[p] = {"status": "planned"}
+                    changed.update(outputs[p])
+                else:
+                    print(f"  -> {p} ({', '.join(c['script'] for step in PROCESS_COMMANDS[p] for c in step)})")
+                    running[pool.submit(run_process, p)] = p
+                if p in status:
+                    print(f"  [{status[p]['status']}] {p}")
+
+            if not running:
+                if len(status) < len(processes) and not progressed(status, processes, upstream):
+                    raise RuntimeError("Graphe de lignage cyclique : processus non ordonnançables")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                p = running.pop(future)
+                status[p] = future.result()
+                print(f"  [{status[p]['status']}] {p} en {status[p]['duration_s']}s")
+                # La propagation n'a lieu que si la sortie a réellement changé
+                for d in outputs[p]:
+                    current[d] = fingerprint(d)
+                    if current[d] is None or current[d] != stored[d]:
+                        changed.add(d)
+
+    if dry_run:
+        return status
+
+    print("\n[3/3] Mise à jour des métadonnées de lignage...")
+    now = datetime.now().isoformat(timespec="seconds")
+    for p, result in status.items():
+        runtime = nodes[p].setdefault("runtime", {})
+        runtime["last_status"] = result["status"]
+        runtime["last_checked"] = now
+        if "duration_s" in result:
+            runtime["last_run"] = result
+    for d in datasets:
+        # Un dataset n'est marqué comme traité que si aucun consommateur n'a échoué
+        consumers = [c for c in outputs[d] if c in status]
+        if all(status[c]["status"] not in ("failed", "upstream_failed") for c in consumers):
+            nodes[d].setdefault("runtime", {})["fingerprint"] = current[d]
+    save_lineage(lineage)
+    print(f"  Lignage mis à jour : {LINEAGE_PATH}")
+    return status
+
+
+def run_scheduler(dry_run=False, force=False, workers=4):
+    print("=" * 60)
+    print("ORDONNANCEUR PILOTÉ PAR LE LIGNAGE")
+    print("=" * 60)
+    start = time.perf_counter()
+    status = schedule(load_lineage(), dry_run=dry_run, force=force, workers=workers)
+    ran = [p for p, r in status.items() if r["status"] in ("success", "failed", "planned")]
+    print(f"\n{len(ran)}/{len(status)} processus {'prévus' if dry_run else 'exécutés'} "
+          f"en {time.perf_counter() - start:.2f}s")
+    return all(r["status"] != "failed" for r in status.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcul sélectif guidé par data_lineage.json")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche le plan sans rien exécuter")
+    parser.add_argument("--force", action="store_true", help="Considère tous les datasets comme modifiés")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    if not run_scheduler(dry_run=args.dry_run, force=args.force, workers=args.workers):
+        sys.exit(1)
@@ -0,0 +1,135 @@
+"""
+Migrations versionnées du schéma (sql/migrations/V<NNN>__<description>.sql)
+Applique dans l'ordre les migrations absentes de la table schema_migrations et enregistre
+leur empreinte ; une migration déjà appliquée dont le fichier a changé est signalée.
+Les migrations optionnelles (sql/migrations/optional/P<NNN>__*.sql, ex. partitionnement)
+ne sont appliquées qu'avec --with-optional.
+Usage: python scripts/migrate.py [--status] [--dry-run] [--with-optional]
+"""
+import pymysql
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sys
+import time
+
+DB_CONFIG = {
+    "host": "localhost",
+    "port": 3307,
+    "user": "dq_user",
+    "password": "dq_password",
+    "database": "data_quality"
+}
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATIONS_DIR = os.path.join(PROJECT_DIR, "sql", "migrations")
+OPTIONAL_DIR = os.path.join(MIGRATIONS_DIR, "optional")
+FILE_PATTERN = re.compile(r"^([VP]\d{3})__(\w+)\.sql$")
+
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(10) PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        duration_s DECIMAL(10, 3) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def discover(with_optional=False):
+    """Migrations disponibles, triées : [(version, description, chemin, checksum)]"""
+    directories = [MIGRATIONS_DIR] + ([OPTIONAL_DIR] if with_optional else [])
+    migrations = []
+    for directory in directories:
+        for path in glob.glob(os.path.join(directory, "*.sql")):
+            match = FILE_PATTERN.match(os.path.basename(path))
+            if not match:
+                print(f"  [WARN] Fichier ignoré (nom attendu V001__description.sql) : {path}")
+                continue
+            with open(path, "rb") as f:
+                checksum = hashlib.sha256(f.read()).hexdigest()
+            migrations.append((match.group(1), match.group(2).replace("_", " "), path, checksum))
+    # Les migrations V passent avant les optionnelles P, chacune dans l'ordre de version
+    return sorted(migrations, key=lambda m: (m[0][0] != "V", m[0]))
+
+
+def statements(path):
+    """Instructions SQL d'un fichier (commentaires -- retirés, séparateur ;)"""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line for line in f if not line.lstrip().startswith("--")]
+    return [stmt.strip() for stmt in "".join(lines).split(";") if stmt.strip()]
+
+
+def applied_migrations(conn):
+    cursor = conn.cursor()
+    cursor.execute(CREATE_TABLE)
+    cursor.execute("SELECT version, checksum, applied_at FROM schema_migrations")
+    return {version: (checksum, applied_at) for version, checksum, applied_at in cursor.fetchall()}
+
+
+def migrate(dry_run=False, with_optional=False, status_only=False):
+    print("=" * 60)
+    print("MIGRATIONS DU SCHÉMA")
+    print("=" * 60)
+    conn = pymysql.connect(**DB_CONFIG)
+    applied = applied_migrations(conn)
+    migrations = discover(with_optional)
+
+    pending = []
+    for version, description, path, checksum in migrations:
+        if version in applied:
+            drift = applied[version][0] != checksum
+            label = "MODIFIÉE depuis application" if drift else f"appliquée le {applied[version][1]}"
+            print(f"  [{'!!' if drift else 'OK'}] {version} {description} ({label})")
+        else:
+            print(f"  [  ] {version} {description}")
+            pending.append((version, description, path, checksum))
+
+    if status_only or not pending:
+        print(f"\n{len(pending)} migration(s) en attente.")
+        conn.close()
+        return True
+    if dry_run:
+        for version, _, path, _ in pending:
+            print(f"\n-- {version}")
+            for stmt in statements(path):
+                print(f"{stmt};")
+        conn.close()
+        return True
+
+    cursor = conn.cursor()
+    for version, description, path, checksum in pending:
+        # Le DDL MariaDB n'est pas transactionnel : chaque instruction est idempotente (IF NOT EXISTS)
+        # pour qu'une migration interrompue puisse être relancée telle quelle.
+        start = time.perf_counter()
+        try:
+            for stmt in statements(path):
+                cursor.execute(stmt)
+        except Exception as e:
+            print(f"\n  ERREUR {version} : {e}")
+            conn.close()
+            return False
+        duration = time.perf_counter() - start
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description, checksum, duration_s) VALUES (%s, %s, %s, %s)",
+            (version, description, checksum, round(duration, 3))
+        )
+        conn.commit()
+        print(f"  -> {version} appliquée en {duration:.2f}s")
+    conn.close()
+    print(f"\n{len(pending)} migration(s) appliquée(s).")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Applique les migrations versionnées de sql/migrations")
+    parser.add_argument("--status", action="store_true", help="Affiche l'état sans rien appliquer")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche le SQL des migrations en attente")
+    parser.add_argument("--with-optional", action="store_true",
+                        help="Inclut sql/migrations/optional (partitionnement)")
+    args = parser.parse_args()
+    if not migrate(dry_run=args.dry_run, with_optional=args.with_optional, status_only=args.status):
+        sys.exit(1)
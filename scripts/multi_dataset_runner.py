@@ -0,0 +1,130 @@
+"""
+Exécution concurrente du pipeline sur plusieurs datasets
+Chaque dataset est un job (import -> nettoyage -> validation -> KPIs) exécuté dans
+des sous-processus limités en mémoire et en CPU. Un pool borné de workers traite
+les jobs du plus petit au plus gros CSV, pour que les petits flux n'attendent pas.
+Les durées et scores de chaque étape sont écrits dans pipeline_runs.
+Usage: python scripts/multi_dataset_runner.py [--datasets retail store_lyon] [--workers 4]
+                                               [--memory-mb 2048] [--cpu-seconds 1800]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from datasets import list_datasets
+from pipeline_metrics import record_stage
+
+try:
+    import resource
+except ImportError:  # Windows : pas de limites par processus
+    resource = None
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(PROJECT_DIR, "scripts")
+
+# Étapes d'un job : script et codes de retour acceptés (le validateur sort en 1 si des règles échouent)
+STAGES = [
+    ("import", "import_data.py", [], (0,)),
+    ("clean", "cleaning_pipeline.py", [], (0,)),
+    ("validate", "great_expectations_validator.py", ["--fast-startup"], (0, 1)),
+    ("kpis", "run_kpis.py", [], (0,)),
+]
+
+
+# Lanceur appliquant RLIMIT_AS / RLIMIT_CPU puis remplaçant le processus par l'étape (execv).
+# Les limites sont posées dans un interpréteur neuf : preexec_fn n'est pas sûr lorsque des
+# threads tournent, or run_job s'exécute dans les workers du pool.
+LIMITS_LAUNCHER = """
+import os, resource, sys
+memory, cpu = int(sys.argv[1]), int(sys.argv[2])
+if memory:
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+if cpu:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+os.execv(sys.argv[3], sys.argv[3:])
+"""
+
+
+def limited_command(cmd, memory_mb, cpu_seconds):
+    """Commande lancée sous les limites CPU/mémoire (POSIX uniquement)"""
+    if resource is None or (not memory_mb and not cpu_seconds):
+        return cmd
+    memory = (memory_mb or 0) * 1024 * 1024
+    return [sys.executable, "-c", LIMITS_LAUNCHER, str(memory), str(cpu_seconds or 0)] + cmd
+
+
+def run_job(dataset, memory_mb=None, cpu_seconds=None, stages=None):
+    """Exécute les étapes d'un dataset en séquence ; s'arrête à la première étape en échec"""
+    started_at = datetime.now()
+    start = time.perf_counter()
+    results = []
+    for stage, script, args, ok_codes in STAGES:
+        if stages and stage not in stages:
+            continue
+        cmd = [sys.executable, os.path.join(SCRIPTS_DIR, script), "--dataset", dataset["name"]] + args
+        stage_start = time.perf_counter()
+        proc = subprocess.run(
+            limited_command(cmd, memory_mb, cpu_seconds), cwd=PROJECT_DIR, capture_output=True, text=True
+        )
+        ok = proc.returncode in ok_codes
+        results.append({
+            "stage": stage,
+            "returncode": proc.returncode,
+            "duration_s": round(time.perf_counter() - stage_start, 3),
+            "ok": ok,
+            "log_tail": (proc.stdout + proc.stderr)[-2000:] if not ok else "",
+        })
+        if not ok:
+            break
+    status = "success" if all(r["ok"] for r in results) else "failed"
+    record_stage(dataset["name"], "job", started_at, time.perf_counter() - start, status=status)
+    return {"dataset": dataset["name"], "status": status,
+            "duration_s": round(time.perf_counter() - start, 3), "stages": results}
+
+
+def run_all(names=None, workers=4, memory_mb=None, cpu_seconds=None, stages=None):
+    print("=" * 60)
+    print("EXÉCUTION MULTI-DATASETS")
+    print("=" * 60)
+    datasets = list_datasets()
+    selected = [datasets[n] for n in names] if names else list(datasets.values())
+
+    # Plus petits fichiers d'abord : les petits flux passent devant les gros
+    def size(ds):
+        return os.path.getsize(ds["csv_path"]) if os.path.exists(ds["csv_path"]) else 0
+    selected.sort(key=size)
+
+    print(f"\n{len(selected)} datasets, {workers} workers, "
+          f"limites : {memory_mb or '-'} Mo / {cpu_seconds or '-'} s CPU par étape")
+    start = time.perf_counter()
+    summaries = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_job, ds, memory_mb, cpu_seconds, stages) for ds in selected]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            detail = ", ".join(f"{r['stage']} {r['duration_s']}s" for r in summary["stages"])
+            print(f"  [{summary['status'].upper()}] {summary['dataset']} ({summary['duration_s']}s) : {detail}")
+            for r in summary["stages"]:
+                if r["log_tail"]:
+                    print(f"    Échec {r['stage']} (code {r['returncode']}) :\n{r['log_tail']}")
+
+    failed = [s["dataset"] for s in summaries if s["status"] != "success"]
+    print(f"\nTerminé en {time.perf_counter() - start:.2f}s : "
+          f"{len(summaries) - len(failed)} succès, {len(failed)} échecs")
+    return not failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline qualité sur plusieurs datasets en parallèle")
+    parser.add_argument("--datasets", nargs="*", help="Datasets à traiter (défaut : tous)")
+    parser.add_argument("--workers", type=int, default=4, help="Nombre de jobs simultanés")
+    parser.add_argument("--memory-mb", type=int, help="Mémoire virtuelle max par étape (Mo)")
+    parser.add_argument("--cpu-seconds", type=int, help="Temps CPU max par étape (s)")
+    parser.add_argument("--stages", nargs="*", choices=[s[0] for s in STAGES])
+    args = parser.parse_args()
+    if not run_all(args.datasets, args.workers, args.memory_mb, args.cpu_seconds, args.stages):
+        sys.exit(1)
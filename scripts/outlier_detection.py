@@ -0,0 +1,338 @@
+"""
+Détection des valeurs aberrantes - Pilier Validité
+Statistiques robustes par groupe (médiane/MAD, IQR) sur Unit_Price, Quantity et Total_Amount,
+calculées par Product_Category et par (Product_Category, Product_Name).
+Les quantiles groupés sont obtenus en un seul tri vectorisé (NumPy), sans boucle Python par groupe.
+Un mode par chunks (--chunked) fusionne des histogrammes par groupe pour les très gros volumes.
+Usage: python scripts/outlier_detection.py [--chunked] [--chunk-size 500000]
+"""
+import pandas as pd
+import numpy as np
+import pymysql
+import argparse
+import os
+from datetime import datetime
+from datasets import DEFAULT_DATASET, get_dataset, report_name
+from profiling import profiled
+
+# === CONFIG ===
+DB_CONFIG = {
+    "host": "localhost",
+    "port": 3307,
+    "user": "dq_user",
+    "password": "dq_password",
+    "database": "data_quality"
+}
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(PROJECT_DIR, "reports")
+
+MEASURES = ["Unit_Price", "Quantity", "Total_Amount"]
+GROUP_COLS = ["Product_Category", "Product_Name"]
+MAD_K = 3.5            # seuil en écarts-MAD normalisés
+IQR_K = 3.0            # clôtures extrêmes de Tukey
+MAD_SCALE = 1.4826     # MAD -> écart-type pour une loi normale
+MIN_GROUP_SIZE = 30    # en dessous, on retombe sur les statistiques de la catégorie
+
+# Histogramme log-espacé utilisé par le mode chunké (fusionnable par addition)
+SKETCH_BINS = 2048
+SKETCH_MIN = 1e-2
+SKETCH_MAX = 1e7
+
+
+def grouped_quantiles(codes, values, probs, n_groups):
+    """Quantiles par groupe (interpolation linéaire, comme np.quantile) en un seul tri.
+
+    codes : entiers 0..n_groups-1, values : float (NaN ignorés).
+    Retourne (counts, matrice n_groups x len(probs)).
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    keep = ~np.isnan(values)
+    codes, values = codes[keep], values[keep]
+
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    out = np.full((n_groups, len(probs)), np.nan)
+    filled = counts > 0
+    last = counts[filled] - 1
+    base = starts[filled]
+    for j, p in enumerate(probs):
+        pos = p * last
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, last)
+        frac = pos - lo
+        out[filled, j] = sorted_values[base + lo] * (1 - frac) + sorted_values[base + hi] * frac
+    return counts, out
+
+
+def robust_stats(codes, values, n_groups):
+    """Médiane, MAD, Q1, Q3 par groupe (deux tris : valeurs puis écarts absolus)."""
+    counts, q = grouped_quantiles(codes, values, [0.25, 0.5, 0.75], n_groups)
+    median = q[:, 1]
+    deviation = np.abs(np.asarray(values, dtype=np.float64) - median[codes])
+    _, mad = grouped_quantiles(codes, deviation, [0.5], n_groups)
+    return {"count": counts, "q1": q[:, 0], "median": median, "q3": q[:, 2], "mad": mad[:, 0]}
+
+
+def fences(stats):
+    """Bornes basses/hautes : intersection des clôtures MAD et IQR (consensus robuste)."""
+    spread = MAD_K * MAD_SCALE * stats["mad"]
+    iqr = stats["q3"] - stats["q1"]
+    low = np.minimum(stats["median"] - spread, stats["q1"] - IQR_K * iqr)
+    high = np.maximum(stats["median"] + spread, stats["q3"] + IQR_K * iqr)
+    return low, high
+
+
+def group_codes(df):
+    """Codes de groupe produit et catégorie, plus le lien produit -> catégorie."""
+    product_codes = df.groupby(GROUP_COLS, sort=False, dropna=False).ngroup().to_numpy()
+    category_codes, categories = pd.factorize(df["Product_Category"], use_na_sentinel=False)
+    n_products = int(product_codes.max()) + 1 if len(product_codes) else 0
+    product_to_category = np.zeros(n_products, dtype=np.int64)
+    product_to_category[product_codes] = category_codes
+    return product_codes, n_products, category_codes, len(categories), product_to_category
+
+
+def resolve_bounds(product_stats, category_stats, product_to_category):
+    """Bornes par produit, remplacées par celles de la catégorie si le groupe est trop petit."""
+    p_low, p_high = fences(product_stats)
+    c_low, c_high = fences(category_stats)
+    small = product_stats["count"] < MIN_GROUP_SIZE
+    p_low[small] = c_low[product_to_category[small]]
+    p_high[small] = c_high[product_to_category[small]]
+    return p_low, p_high
+
+
+def detect_outliers(df):
+    """Détection exacte en mémoire. Retourne (masque par mesure, DataFrame des lignes signalées)."""
+    product_codes, n_products, category_codes, n_categories, product_to_category = group_codes(df)
+
+    flags = {}
+    for col in MEASURES:
+        values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+        product_stats = robust_stats(product_codes, values, n_products)
+        category_stats = robust_stats(category_codes, values, n_categories)
+        low, high = resolve_bounds(product_stats, category_stats, product_to_category)
+        flags[col] = (values < low[product_codes]) | (values > high[product_codes])
+
+    return flags, flagged_rows(df, flags)
+
+
+def flagged_rows(df, flags):
+    """Lignes signalées avec la liste des mesures aberrantes."""
+    any_flag = np.zeros(len(df), dtype=bool)
+    for mask in flags.values():
+        any_flag |= mask
+    flagged = df.loc[any_flag].copy()
+    reasons = pd.Series("", index=df.index)
+    for col, mask in flags.items():
+        reasons[mask] = reasons[mask] + col + ";"
+    flagged["Outlier_Columns"] = reasons[any_flag].str.rstrip(";")
+    return flagged
+
+
+class GroupedHistogram:
+    """Histogramme log-espacé par groupe, fusionnable entre chunks (addition des comptes).
+
+    Les quantiles obtenus sont approchés à la largeur d'un bin (~0,7 % relatif).
+    Les valeurs <= 0 sont rangées dans le premier bin.
+    """
+
+    edges = np.concatenate(([0.0], np.geomspace(SKETCH_MIN, SKETCH_MAX, SKETCH_BINS)))
+
+    def __init__(self):
+        self.keys = {}
+        self.counts = np.zeros((0, SKETCH_BINS), dtype=np.int64)
+
+    def _codes(self, keys):
+        codes = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            codes[i] = self.keys.setdefault(key, len(self.keys))
+        if len(self.keys) > self.counts.shape[0]:
+            grown = np.zeros((len(self.keys), SKETCH_BINS), dtype=np.int64)
+            grown[:self.counts.shape[0]] = self.counts
+            self.counts = grown
+        return codes
+
+    def update(self, keys, codes, values):
+        """Ajoute un chunk. keys : clés uniques du chunk, codes : index dans keys par ligne."""
+        values = np.asarray(values, dtype=np.float64)
+        keep = ~np.isnan(values)
+        global_codes = self._codes(keys)[np.asarray(codes)[keep]]
+        bins = np.clip(np.searchsorted(self.edges, values[keep], side="right") - 1, 0, SKETCH_BINS - 1)
+        flat = np.bincount(global_codes * SKETCH_BINS + bins, minlength=self.counts.size)
+        self.counts += flat.reshape(self.counts.shape)
+
+    def merge(self, other):
+        codes = self._codes(list(other.keys))
+        self.counts[codes] += other.counts[:len(other.keys)]
+        return self
+
+    def quantiles(self, probs):
+        """Quantiles par clé : {clé: array(len(probs))}, interpolés au centre des bins."""
+        centers = np.concatenate(([0.0], np.sqrt(self.edges[1:-1] * self.edges[2:])))
+        cumulative = np.cumsum(self.counts, axis=1)
+        totals = cumulative[:, -1]
+        result = {}
+        for key, code in self.keys.items():
+            if totals[code] == 0:
+                result[key] = np.full(len(probs), np.nan)
+                continue
+            ranks = np.asarray(probs) * (totals[code] - 1) + 1
+            result[key] = centers[np.searchsorted(cumulative[code], ranks)]
+        return result
+
+
+def detect_outliers_chunked(read_chunks, chunk_size):
+    """Détection en deux passes sur des chunks (scalable, mémoire bornée).
+
+    read_chunks(chunk_size) doit renvoyer un nouvel itérateur de DataFrames à chaque appel.
+    Passe 1 : histogrammes des valeurs -> médiane, Q1, Q3. Passe 2 : histogrammes des écarts -> MAD.
+    Passe 3 : application des bornes et collecte des lignes signalées.
+    """
+    levels = {"product": GROUP_COLS, "category": ["Product_Category"]}
+
+    def chunk_groups(chunk, cols):
+        # NaN -> "" : les clés doivent rester égales d'un chunk à l'autre
+        frame = chunk[cols].astype(object).where(chunk[cols].notna(), "")
+        codes, uniques = pd.MultiIndex.from_frame(frame).factorize()
+        return codes, [tuple(u) for u in uniques]
+
+    values_hist = {(col, lvl): GroupedHistogram() for col in MEASURES for lvl in levels}
+    for chunk in read_chunks(chunk_size):
+        for lvl, cols in levels.items():
+            codes, keys = chunk_groups(chunk, cols)
+            for col in MEASURES:
+                values_hist[(col, lvl)].update(keys, codes, pd.to_numeric(chunk[col], errors="coerce"))
+
+    quartiles = {k: h.quantiles([0.25, 0.5, 0.75]) for k, h in values_hist.items()}
+    totals = {k: dict(zip(h.keys, h.counts[:len(h.keys)].sum(axis=1))) for k, h in values_hist.items()}
+
+    deviation_hist = {k: GroupedHistogram() for k in values_hist}
+    for chunk in read_chunks(chunk_size):
+        for lvl, cols in levels.items():
+            codes, keys = chunk_groups(chunk, cols)
+            for col in MEASURES:
+                medians = np.array([quartiles[(col, lvl)][k][1] for k in keys])
+                values = pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=np.float64)
+                deviation_hist[(col, lvl)].update(keys, codes, np.abs(values - medians[codes]))
+
+    bounds = {}
+    for (col, lvl), q in quartiles.items():
+        mads = deviation_hist[(col, lvl)].quantiles([0.5])
+        for key, (q1, median, q3) in q.items():
+            stats = {k: np.array([v]) for k, v in
+                     {"q1": q1, "median": median, "q3": q3, "mad": mads[key][0]}.items()}
+            low, high = fences(stats)
+            bounds[(col, lvl, key)] = (low[0], high[0])
+
+    flagged_parts = []
+    flag_counts = {col: 0 for col in MEASURES}
+    total_rows = 0
+    for chunk in read_chunks(chunk_size):
+        total_rows += len(chunk)
+        codes, keys = chunk_groups(chunk, GROUP_COLS)
+        flags = {}
+        for col in MEASURES:
+            key_bounds = np.array([
+                bounds[(col, "category", key[:1])]
+                if totals[(col, "product")].get(key, 0) < MIN_GROUP_SIZE
+                else bounds[(col, "product", key)]
+                for key in keys
+            ]).reshape(-1, 2)
+            values = pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=np.float64)
+            flags[col] = (values < key_bounds[codes, 0]) | (values > key_bounds[codes, 1])
+            flag_counts[col] += int(flags[col].sum())
+        flagged_parts.append(flagged_rows(chunk, flags))
+
+    flagged = pd.concat(flagged_parts, ignore_index=True) if flagged_parts else pd.DataFrame()
+    return flag_counts, total_rows, flagged
+
+
+def save_metrics(conn, flag_counts, total_rows, dataset=DEFAULT_DATASET):
+    """Enregistre une mesure 'Validite' par colonne dans quality_metrics (remplace celle du jour)."""
+    cursor = conn.cursor()
+    for col in MEASURES:
+        description = f"Valeurs aberrantes {col} (MAD/IQR par produit)"
+        issues = flag_counts[col]
+        score = (1 - issues / total_rows) * 100 if total_rows else 100.0
+        cursor.execute(
+            "DELETE FROM quality_metrics WHERE metric_date = CURRENT_DATE() AND dataset = %s "
+            "AND pillar = 'Validite' AND column_name = %s AND description = %s",
+            (dataset, col, description)
+        )
+        cursor.execute(
+            "INSERT INTO quality_metrics (dataset, metric_date, pillar, column_name, score, issues_count, total_count, description) "
+            "VALUES (%s, CURRENT_DATE(), 'Validite', %s, %s, %s, %s, %s)",
+            (dataset, col, round(score, 2), issues, total_rows, description)
+        )
+    conn.commit()
+
+
+def run_outlier_detection(chunked=False, chunk_size=500000, dataset=DEFAULT_DATASET):
+    ds = get_dataset(dataset)
+    print("=" * 60)
+    print("DÉTECTION DES VALEURS ABERRANTES (MAD / IQR PAR GROUPE)")
+    print("=" * 60)
+    start = datetime.now()
+
+    conn = pymysql.connect(**DB_CONFIG)
+    cols = GROUP_COLS + MEASURES
+    query = f"SELECT Transaction_ID, {', '.join(cols)} FROM {ds['cleaned_table']}"
+
+    if chunked:
+        print(f"\n[1/3] Lecture par chunks de {chunk_size} lignes (3 passes)...")
+
+        def read_chunks(size):
+            # Pagination par clé : chunksize de read_sql garderait tout le résultat côté client
+            last_id = None
+            while True:
+                where = "" if last_id is None else " WHERE Transaction_ID > %s"
+                params = () if last_id is None else (last_id,)
+                chunk = pd.read_sql(f"{query}{where} ORDER BY Transaction_ID LIMIT {int(size)}",
+                                    conn, params=params)
+                if chunk.empty:
+                    return
+                yield chunk
+                last_id = int(chunk["Transaction_ID"].iloc[-1])
+
+        flag_counts, total_rows, flagged = detect_outliers_chunked(read_chunks, chunk_size)
+    else:
+        print("\n[1/3] Chargement de la table en mémoire...")
+        df = pd.read_sql(query, conn)
+        total_rows = len(df)
+        flags, flagged = detect_outliers(df)
+        flag_counts = {col: int(mask.sum()) for col, mask in flags.items()}
+
+    print(f"  {total_rows} lignes analysées.")
+    print("\n[2/3] Résultats par mesure :")
+    for col, count in flag_counts.items():
+        print(f"  - {col}: {count} valeurs aberrantes")
+
+    print("\n[3/3] Sauvegarde...")
+    save_metrics(conn, flag_counts, total_rows, ds["name"])
+    conn.close()
+    print("  - Mesures ajoutées à quality_metrics (pilier Validite)")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    csv_path = os.path.join(REPORT_DIR, report_name(ds, "outliers_flagged.csv"))
+    flagged.to_csv(csv_path, index=False)
+    print(f"  - {len(flagged)} lignes signalées : {csv_path}")
+
+    elapsed = (datetime.now() - start).total_seconds()
+    print(f"\nTerminé en {elapsed:.2f}s")
+    return flag_counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Détection des valeurs aberrantes par groupe")
+    parser.add_argument("--chunked", action="store_true", help="Mode par chunks (mémoire bornée)")
+    parser.add_argument("--chunk-size", type=int, default=500000)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--profile", action="store_true", help="Profil CPU/allocations dans reports/profiles/")
+    args = parser.parse_args()
+    with profiled(f"outliers_{args.dataset}", args.profile):
+        run_outlier_detection(chunked=args.chunked, chunk_size=args.chunk_size, dataset=args.dataset)
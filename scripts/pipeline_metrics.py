@@ -0,0 +1,52 @@
+"""
+Métriques d'exécution partagées (table pipeline_runs, créée par python scripts/migrate.py)
+Chaque étape enregistre sa durée, le nombre de lignes traitées, le débit et son score
+pour un dataset donné ; les échecs d'écriture ne bloquent jamais le pipeline.
+"""
+import pymysql
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DB_CONFIG = {
+    "host": "localhost",
+    "port": 3307,
+    "user": "dq_user",
+    "password": "dq_password",
+    "database": "data_quality"
+}
+
+
+def record_stage(dataset, stage, started_at, duration_s, rows=None, score=None, status="success"):
+    """Insère une ligne dans pipeline_runs (table créée par sql/migrations V004/V006, sans DDL ici)"""
+    try:
+        conn = pymysql.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+        throughput = rows / duration_s if rows and duration_s > 0 else None
+        cursor.execute(
+            "INSERT INTO pipeline_runs (dataset, stage, started_at, duration_s, rows_processed, score, "
+            "throughput_rps, status) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+            (dataset, stage, started_at, round(duration_s, 3), rows,
+             None if score is None else round(score, 2),
+             None if throughput is None else round(throughput, 1), status)
+        )
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"  [WARN] Métriques d'exécution non enregistrées ({stage}) : {e}")
+
+
+@contextmanager
+def stage_timer(dataset, stage):
+    """Chronomètre une étape ; le bloc renseigne run['rows'], run['score'] et éventuellement run['status']"""
+    run = {"rows": None, "score": None, "status": "success"}
+    started_at = datetime.now()
+    start = time.perf_counter()
+    try:
+        yield run
+    except BaseException:
+        record_stage(dataset, stage, started_at, time.perf_counter() - start,
+                     run["rows"], run["score"], status="failed")
+        raise
+    record_stage(dataset, stage, started_at, time.perf_counter() - start,
+                 run["rows"], run["score"], status=run["status"])
@@ -0,0 +1,109 @@
+"""
+Profilage à la demande des étapes du pipeline (option --profile des scripts)
+Pour une étape : profil cProfile (.pstats), échantillonnage de la pile toutes les
+10 ms au format "collapsed" (flame graphs : flamegraph.pl, speedscope), et top N
+des sites d'allocation tracemalloc. Résumé texte dans reports/profiles/<run>/<étape>_summary.txt.
+Le dossier de run vient de PROFILE_RUN_ID (positionné par le DAG), sinon de l'horodatage.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.path.join(PROJECT_DIR, "reports", "profiles")
+SAMPLE_INTERVAL = 0.01
+TOP_N = 25
+
+
+def run_dir():
+    run_id = os.environ.get("PROFILE_RUN_ID") or datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(PROFILE_DIR, "".join(c if c.isalnum() or c in "-_." else "_" for c in run_id))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class StackSampler(threading.Thread):
+    """Échantillonne la pile d'un thread et compte les piles identiques (format collapsed)"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+
+def _summary(stage, elapsed, profiler, sampler, snapshot, peak, top_n):
+    out = io.StringIO()
+    out.write(f"Étape : {stage}\n")
+    out.write(f"Durée : {elapsed:.3f}s | pic mémoire suivi : {peak / 1024 / 1024:.1f} Mo | "
+              f"{sum(sampler.stacks.values())} échantillons\n")
+
+    out.write(f"\n=== Top {top_n} fonctions (temps cumulé, cProfile) ===\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(top_n)
+
+    out.write(f"\n=== Top {top_n} sites d'allocation (tracemalloc) ===\n")
+    for stat in snapshot.statistics("lineno")[:top_n]:
+        frame = stat.traceback[0]
+        out.write(f"{stat.size / 1024:>10.1f} Kio  {stat.count:>8} blocs  {frame.filename}:{frame.lineno}\n")
+    return out.getvalue()
+
+
+@contextmanager
+def profiled(stage, enabled=True, top_n=TOP_N):
+    """Profile le bloc si enabled ; écrit {stage}.pstats, {stage}.collapsed et {stage}_summary.txt"""
+    if not enabled:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident())
+    tracemalloc.start(10)
+    sampler.start()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        directory = run_dir()
+        base = os.path.join(directory, stage)
+        profiler.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(f"{base}_summary.txt", "w", encoding="utf-8") as f:
+            f.write(_summary(stage, elapsed, profiler, sampler, snapshot, peak, top_n))
+        print(f"  [PROFIL] {stage} : {elapsed:.2f}s, pic mémoire {peak / 1024 / 1024:.1f} Mo -> {directory}")
@@ -0,0 +1,333 @@
+"""
+Compteurs qualité maintenus à chaque chargement
+Chaque import (ou batch du mode micro-batch) ajoute une ligne de compteurs additifs
+(valeurs nulles, règles invalides, totaux incohérents...) calculés sur les seules lignes
+chargées. Les clés Transaction_ID déjà vues sont conservées pour l'unicité, et les dates
+postérieures au chargement sont comptées par jour, car elles cessent d'être futures avec le temps.
+quality_metrics et quality_scores_history sont alors dérivés des compteurs sans relire {prefix}_raw.
+Usage: python scripts/quality_counters.py [--dataset retail] [--reconcile] [--rebuild]
+"""
+import pandas as pd
+import numpy as np
+import pymysql
+import argparse
+import sys
+from datetime import date
+from datasets import DEFAULT_DATASET, get_dataset, ensure_tables
+
+DB_CONFIG = {
+    "host": "localhost",
+    "port": 3307,
+    "user": "dq_user",
+    "password": "dq_password",
+    "database": "data_quality"
+}
+
+COUNTERS = [
+    "rows_total", "null_product_name", "null_unit_price", "null_total_amount",
+    "customer_id_valid", "customer_id_invalid", "price_valid", "price_invalid",
+    "quantity_valid", "quantity_invalid", "total_consistent", "total_inconsistent",
+    "null_dates", "past_dates", "distinct_ids_added",
+]
+
+CREATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS quality_load_counters (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        dataset VARCHAR(50) NOT NULL,
+        source VARCHAR(255) NOT NULL,
+        load_date DATE NOT NULL,
+""" + ",\n".join(f"        {c} INT NOT NULL DEFAULT 0" for c in COUNTERS) + """,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_counters_dataset (dataset)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quality_counter_keys (
+        dataset VARCHAR(50) NOT NULL,
+        Transaction_ID INT NOT NULL,
+        PRIMARY KEY (dataset, Transaction_ID)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quality_counter_dates (
+        dataset VARCHAR(50) NOT NULL,
+        Transaction_Date DATE NOT NULL,
+        rows_count INT NOT NULL,
+        PRIMARY KEY (dataset, Transaction_Date)
+    )
+    """,
+]
+
+# Recalcul complet avec la même sémantique que sql/quality_kpis.sql (rapprochement et reconstruction)
+FULL_COUNTS_SQL = """
+    SELECT COUNT(*),
+           COALESCE(SUM(Product_Name IS NULL), 0),
+           COALESCE(SUM(Unit_Price IS NULL), 0),
+           COALESCE(SUM(Total_Amount IS NULL), 0),
+           COALESCE(SUM(Customer_ID REGEXP '^CUST-[0-9]{{4}}$'), 0),
+           COALESCE(SUM(Customer_ID NOT REGEXP '^CUST-[0-9]{{4}}$'), 0),
+           COALESCE(SUM(Unit_Price > 0), 0),
+           COALESCE(SUM(Unit_Price <= 0 OR Unit_Price IS NULL), 0),
+           COALESCE(SUM(Quantity > 0), 0),
+           COALESCE(SUM(Quantity <= 0 OR Quantity IS NULL), 0),
+           COALESCE(SUM(ABS(Total_Amount - (Unit_Price * Quantity)) < 0.05), 0),
+           COALESCE(SUM(ABS(Total_Amount - (Unit_Price * Quantity)) >= 0.05 OR Total_Amount IS NULL), 0),
+           COALESCE(SUM(Transaction_Date IS NULL), 0),
+           COALESCE(SUM(Transaction_Date <= CURRENT_DATE()), 0),
+           COUNT(DISTINCT Transaction_ID)
+    FROM {table}
+"""
+
+# (pilier, colonne, compteur "bon", compteur "problème", description) : mêmes lignes que quality_kpis.sql
+METRICS = [
+    ("Completude", "Product_Name", None, "null_product_name", "Valeurs manquantes dans Product_Name"),
+    ("Completude", "Unit_Price", None, "null_unit_price", "Valeurs manquantes dans Unit_Price"),
+    ("Completude", "Total_Amount", None, "null_total_amount", "Valeurs manquantes dans Total_Amount"),
+    ("Exactitude", "Customer_ID", "customer_id_valid", "customer_id_invalid",
+     "Format Customer_ID incorrect (attendu CUST-XXXX)"),
+    ("Validite", "Unit_Price", "price_valid", "price_invalid", "Prix unitaire invalide (<= 0)"),
+    ("Validite", "Quantity", "quantity_valid", "quantity_invalid", "Quantite invalide (<= 0)"),
+    ("Coherence", "Total_Amount", "total_consistent", "total_inconsistent", "Incoherence Total != Prix * Quantite"),
+    ("Unicite", "Transaction_ID", "distinct_ids_added", "duplicate_ids", "Doublons de Transaction_ID"),
+    ("Actualite", "Transaction_Date", "current_dates", "future_or_null_dates", "Date de transaction future ou invalide"),
+]
+
+
+def ensure_counter_tables(conn):
+    cursor = conn.cursor()
+    for statement in CREATE_TABLES:
+        cursor.execute(statement)
+
+
+def _decimal(values):
+    """Arrondi DECIMAL(10, 2) de MariaDB (demi-valeur éloignée de zéro)"""
+    values = pd.to_numeric(values, errors="coerce")
+    return np.sign(values) * np.floor(values.abs() * 100 + 0.5 + 1e-9) / 100
+
+
+def count_frame(df, load_date):
+    """Compteurs additifs d'un lot de lignes brutes, et nb de lignes par date postérieure à load_date"""
+    price = _decimal(df["Unit_Price"])
+    total = _decimal(df["Total_Amount"])
+    quantity = pd.to_numeric(df["Quantity"], errors="coerce").round()
+    customer = df["Customer_ID"].dropna().astype(str)
+    # REGEXP MariaDB : insensible à la casse avec la collation par défaut
+    customer_ok = customer.str.fullmatch(r"CUST-[0-9]{4}", case=False)
+    gap = (total - price * quantity).abs()
+    dates = pd.to_datetime(df["Transaction_Date"], errors="coerce").dt.date
+
+    counts = {
+        "rows_total": len(df),
+        "null_product_name": int(df["Product_Name"].isna().sum()),
+        "null_unit_price": int(price.isna().sum()),
+        "null_total_amount": int(total.isna().sum()),
+        "customer_id_valid": int(customer_ok.sum()),
+        "customer_id_invalid": int((~customer_ok).sum()),
+        "price_valid": int((price > 0).sum()),
+        "price_invalid": int(((price <= 0) | price.isna()).sum()),
+        "quantity_valid": int((quantity > 0).sum()),
+        "quantity_invalid": int(((quantity <= 0) | quantity.isna()).sum()),
+        "total_consistent": int((gap < 0.05).sum()),
+        "total_inconsistent": int(((gap >= 0.05) | total.isna()).sum()),
+        "null_dates": int(dates.isna().sum()),
+        "past_dates": int((dates.dropna() <= load_date).sum()),
+    }
+    later = dates.dropna()
+    later = later[later > load_date]
+    return counts, later.value_counts().to_dict()
+
+
+def has_counters(conn, ds):
+    """Vrai si les compteurs du dataset ont été initialisés (import complet ou reconstruction)"""
+    ensure_counter_tables(conn)
+    return counters_initialized(conn, ds)
+
+
+def counters_initialized(conn, ds):
+    """Comme has_counters(), sans DDL : les tables doivent déjà exister"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM quality_load_counters WHERE dataset = %s LIMIT 1", (ds["name"],))
+    return cursor.fetchone() is not None
+
+
+def reset_counters(conn, ds):
+    """Supprime les compteurs du dataset (la table brute vient d'être vidée), sans commit.
+
+    Aucun DDL ici non plus : l'import vide la table brute et les compteurs dans une même
+    transaction, après ensure_counter_tables().
+    """
+    cursor = conn.cursor()
+    for table in ("quality_load_counters", "quality_counter_keys", "quality_counter_dates"):
+        cursor.execute(f"DELETE FROM {table} WHERE dataset = %s", (ds["name"],))
+
+
+def record_load(conn, ds, df, source):
+    """Ajoute les compteurs d'un lot chargé, dans la transaction de l'appelant (pas de commit).
+
+    Aucun DDL ici (commit implicite) : les tables sont créées par ensure_counter_tables().
+    """
+    load_date = date.today()
+    counts, later = count_frame(df, load_date)
+    cursor = conn.cursor()
+
+    # Unicité : seules les clés jamais vues augmentent le nombre de Transaction_ID distincts
+    keys = pd.to_numeric(df["Transaction_ID"], errors="coerce").dropna().astype(np.int64).unique()
+    counts["distinct_ids_added"] = 0
+    if len(keys):
+        cursor.executemany(
+            "INSERT IGNORE INTO quality_counter_keys (dataset, Transaction_ID) VALUES (%s, %s)",
+            [(ds["name"], int(k)) for k in keys]
+        )
+        counts["distinct_ids_added"] = cursor.rowcount
+    if later:
+        cursor.executemany(
+            "INSERT INTO quality_counter_dates (dataset, Transaction_Date, rows_count) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE rows_count = rows_count + VALUES(rows_count)",
+            [(ds["name"], d, int(n)) for d, n in later.items()]
+        )
+    cursor.execute(
+        f"INSERT INTO quality_load_counters (dataset, source, load_date, {', '.join(COUNTERS)}) "
+        f"VALUES (%s, %s, %s, {', '.join(['%s'] * len(COUNTERS))})",
+        (ds["name"], source, load_date, *(counts[c] for c in COUNTERS))
+    )
+    return counts
+
+
+def totals(conn, ds):
+    """Somme des compteurs du dataset, dates futures évaluées à la date du jour"""
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT {', '.join(f'COALESCE(SUM({c}), 0)' for c in COUNTERS)} "
+        "FROM quality_load_counters WHERE dataset = %s", (ds["name"],)
+    )
+    result = {c: int(v) for c, v in zip(COUNTERS, cursor.fetchone())}
+    cursor.execute(
+        "SELECT COALESCE(SUM(CASE WHEN Transaction_Date <= CURRENT_DATE() THEN rows_count END), 0), "
+        "COALESCE(SUM(CASE WHEN Transaction_Date > CURRENT_DATE() THEN rows_count END), 0) "
+        "FROM quality_counter_dates WHERE dataset = %s", (ds["name"],)
+    )
+    became_current, future = (int(v) for v in cursor.fetchone())
+    result["current_dates"] = result["past_dates"] + became_current
+    result["future_dates"] = future
+    result["future_or_null_dates"] = future + result["null_dates"]
+    result["duplicate_ids"] = result["rows_total"] - result["distinct_ids_added"]
+    return result
+
+
+def derive_kpis(conn, ds):
+    """Écrit les KPIs du jour à partir des compteurs ; retourne (nb de lignes, score global) ou None.
+
+    DML uniquement : les tables de compteurs viennent de la migration V005 (ou de l'import).
+    """
+    try:
+        initialized = counters_initialized(conn, ds)
+    except pymysql.err.ProgrammingError:
+        return None  # tables absentes : recalcul complet
+    if not initialized:
+        return None
+    counts = totals(conn, ds)
+    rows = counts["rows_total"]
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM quality_metrics WHERE metric_date = CURRENT_DATE() AND dataset = %s "
+        "AND description NOT LIKE 'Valeurs aberrantes%%'", (ds["name"],)
+    )
+    cursor.execute("DELETE FROM quality_scores_history WHERE report_date = CURRENT_DATE() AND dataset = %s",
+                   (ds["name"],))
+
+    for pillar, column, good, issues, description in METRICS:
+        if not rows:
+            score = None
+        elif good is None:
+            score = (1 - counts[issues] / rows) * 100
+        else:
+            score = counts[good] / rows * 100
+        cursor.execute(
+            "INSERT INTO quality_metrics (dataset, metric_date, pillar, column_name, score, issues_count, "
+            "total_count, description) VALUES (%s, CURRENT_DATE(), %s, %s, %s, %s, %s, %s)",
+            (ds["name"], pillar, column, score, counts[issues], rows, description)
+        )
+
+    pillar_avg = "(SELECT AVG(score) FROM quality_metrics WHERE pillar=%s AND metric_date=CURRENT_DATE() AND dataset=%s)"
+    pillars = ["Completude", "Exactitude", "Validite", "Coherence", "Unicite", "Actualite"]
+    cursor.execute(
+        "INSERT INTO quality_scores_history (dataset, report_date, completeness, accuracy, validity, consistency, "
+        "uniqueness, timeliness, global_score) SELECT %s, CURRENT_DATE(), "
+        + ", ".join([pillar_avg] * len(pillars))
+        + ", (SELECT AVG(score) FROM quality_metrics WHERE metric_date=CURRENT_DATE() AND dataset=%s)",
+        (ds["name"], *(v for p in pillars for v in (p, ds["name"])), ds["name"])
+    )
+    conn.commit()
+    cursor.execute(
+        "SELECT global_score FROM quality_scores_history WHERE dataset = %s AND report_date = CURRENT_DATE() "
+        "ORDER BY id DESC LIMIT 1", (ds["name"],)
+    )
+    row = cursor.fetchone()
+    return rows, None if row is None or row[0] is None else float(row[0])
+
+
+def full_counts(conn, ds):
+    """Recalcul complet sur {prefix}_raw, dans le format de totals()"""
+    cursor = conn.cursor()
+    cursor.execute(FULL_COUNTS_SQL.format(table=ds["raw_table"]))
+    values = [int(v) for v in cursor.fetchone()]
+    result = dict(zip(COUNTERS[:-2] + ["current_dates", "distinct_ids_added"], values))
+    result["future_or_null_dates"] = result["rows_total"] - result["current_dates"]
+    result["duplicate_ids"] = result["rows_total"] - result["distinct_ids_added"]
+    return result
+
+
+def reconcile(conn, ds):
+    """Compare les compteurs à un recalcul complet ; retourne la liste des écarts"""
+    print(f"\n[RAPPROCHEMENT] compteurs vs recalcul complet de {ds['raw_table']}")
+    if not has_counters(conn, ds):
+        print("  Aucun compteur initialisé pour ce dataset (lancer un import ou --rebuild)")
+        return None
+    expected, actual = full_counts(conn, ds), totals(conn, ds)
+    mismatches = []
+    for key, value in expected.items():
+        status = "OK" if actual[key] == value else "ÉCART"
+        if status != "OK":
+            mismatches.append({"counter": key, "counters": actual[key], "full": value})
+        print(f"  [{status}] {key:<22} compteurs={actual[key]:<8} recalcul={value}")
+    print(f"  {len(mismatches)} écart(s)")
+    return mismatches
+
+
+def rebuild(conn, ds):
+    """Réinitialise les compteurs à partir du contenu actuel de {prefix}_raw"""
+    print(f"\n[RECONSTRUCTION] compteurs de {ds['raw_table']}")
+    df = pd.read_sql(f"SELECT * FROM {ds['raw_table']}", conn)
+    ensure_counter_tables(conn)
+    reset_counters(conn, ds)
+    counts = record_load(conn, ds, df, "rebuild")
+    conn.commit()
+    print(f"  {counts['rows_total']} lignes comptées")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compteurs qualité incrémentaux d'un dataset")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--reconcile", action="store_true", help="Vérifie les compteurs contre un recalcul complet")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstruit les compteurs depuis la table brute")
+    args = parser.parse_args()
+
+    ds = get_dataset(args.dataset)
+    conn = pymysql.connect(**DB_CONFIG)
+    ensure_tables(conn, ds)
+    if args.rebuild:
+        rebuild(conn, ds)
+    if args.reconcile:
+        mismatches = reconcile(conn, ds)
+        conn.close()
+        if mismatches is None or mismatches:
+            sys.exit(1)
+    else:
+        result = derive_kpis(conn, ds)
+        conn.close()
+        if result is None:
+            print("Aucun compteur initialisé pour ce dataset (lancer un import ou --rebuild)")
+            sys.exit(1)
+        print(f"KPIs dérivés des compteurs : {result[0]} lignes, score global {result[1]}")
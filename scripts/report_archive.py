@@ -0,0 +1,344 @@
+"""
+Archive des rapports quotidiens, adressée par contenu et compressée
+Chaque fichier est stocké une seule fois sous son SHA-256 (archives/objects/ab/<sha256>),
+compressé en zstd (zlib si le module zstandard est absent). Un index SQLite
+(archives/index.sqlite) relie date -> run -> artefact -> objet : un rapport identique
+d'un jour à l'autre (Sweetviz, profils) ne coûte qu'une ligne d'index.
+La rétention supprime les runs anciens ; les objets devenus orphelins sont mis en file
+et supprimés par lots (compact), sans parcourir l'archive.
+Usage:
+  python scripts/report_archive.py archive [--run-id 20260101T020000] [--date 2026-01-01]
+  python scripts/report_archive.py list [--date 2026-01-01]
+  python scripts/report_archive.py show RUN_ID
+  python scripts/report_archive.py get RUN_ID sweetviz_compare_report.html [-o fichier]
+  python scripts/report_archive.py restore RUN_ID dossier/
+  python scripts/report_archive.py prune [--keep-days 90]
+  python scripts/report_archive.py compact [--limit 500]
+"""
+import argparse
+import fnmatch
+import glob
+import hashlib
+import os
+import sqlite3
+import sys
+import zlib
+from datetime import date, datetime, timedelta
+
+try:
+    import zstandard
+except ImportError:  # zlib en repli ; les objets zstd existants restent illisibles sans le module
+    zstandard = None
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(PROJECT_DIR, "reports")
+ARCHIVE_DIR = os.path.join(PROJECT_DIR, "archives")
+OBJECT_DIR = os.path.join(ARCHIVE_DIR, "objects")
+INDEX_PATH = os.path.join(ARCHIVE_DIR, "index.sqlite")
+
+PATTERNS = ["*.html", "*.json"]
+RETENTION_DAYS = 90
+COMPACT_LIMIT = 500
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+BLOCK_SIZE = 1024 * 1024
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS objects (
+        sha256 TEXT PRIMARY KEY,
+        codec TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        stored_size INTEGER NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id TEXT PRIMARY KEY,
+        run_date TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_runs_date ON runs (run_date);
+    CREATE TABLE IF NOT EXISTS artifacts (
+        run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+        path TEXT NOT NULL,
+        sha256 TEXT NOT NULL REFERENCES objects (sha256),
+        PRIMARY KEY (run_id, path)
+    );
+    CREATE INDEX IF NOT EXISTS idx_artifacts_sha ON artifacts (sha256);
+    CREATE TABLE IF NOT EXISTS orphans (
+        sha256 TEXT PRIMARY KEY
+    );
+"""
+
+
+def connect():
+    os.makedirs(OBJECT_DIR, exist_ok=True)
+    conn = sqlite3.connect(INDEX_PATH)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def object_path(sha256):
+    return os.path.join(OBJECT_DIR, sha256[:2], sha256)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _compress(src, dst):
+    """Compresse src vers dst par blocs ; retourne le codec utilisé"""
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        if zstandard is not None:
+            zstandard.ZstdCompressor(level=ZSTD_LEVEL).copy_stream(fin, fout)
+            return "zstd"
+        compressor = zlib.compressobj(ZLIB_LEVEL)
+        for block in iter(lambda: fin.read(BLOCK_SIZE), b""):
+            fout.write(compressor.compress(block))
+        fout.write(compressor.flush())
+        return "zlib"
+
+
+def put_object(conn, path):
+    """Stocke le contenu de path s'il est nouveau ; retourne (sha256, octets ajoutés à l'archive)"""
+    sha256 = file_sha256(path)
+    if conn.execute("SELECT 1 FROM objects WHERE sha256 = ?", (sha256,)).fetchone():
+        conn.execute("DELETE FROM orphans WHERE sha256 = ?", (sha256,))
+        return sha256, 0
+    target = object_path(sha256)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Fichier temporaire puis renommage : un objet indexé est toujours complet
+    tmp = f"{target}.tmp"
+    codec = _compress(path, tmp)
+    os.replace(tmp, target)
+    stored = os.path.getsize(target)
+    conn.execute(
+        "INSERT INTO objects (sha256, codec, size, stored_size, created_at) VALUES (?, ?, ?, ?, ?)",
+        (sha256, codec, os.path.getsize(path), stored, datetime.now().isoformat(timespec="seconds"))
+    )
+    return sha256, stored
+
+
+def collect(source_dir, run_id, patterns=PATTERNS):
+    """Fichiers à archiver : rapports du dossier, et profils du run (reports/profiles/<run_id>/)"""
+    files = []
+    for pattern in patterns:
+        files += [p for p in glob.glob(os.path.join(source_dir, pattern)) if os.path.isfile(p)]
+    profile_dir = os.path.join(source_dir, "profiles", run_id)
+    for root, _, names in os.walk(profile_dir):
+        files += [os.path.join(root, name) for name in names]
+    return sorted(set(files))
+
+
+def archive_run(run_id=None, run_date=None, source_dir=REPORT_DIR, patterns=PATTERNS):
+    run_date = run_date or date.today().isoformat()
+    run_id = run_id or datetime.now().strftime("%Y%m%dT%H%M%S")
+    print("=" * 60)
+    print(f"ARCHIVAGE DES RAPPORTS (run {run_id}, {run_date})")
+    print("=" * 60)
+    files = collect(source_dir, run_id, patterns)
+    if not files:
+        print(f"  [WARN] Aucun rapport trouvé dans {source_dir}")
+        return None
+
+    conn = connect()
+    total, added, new_objects = 0, 0, 0
+    with conn:
+        # Un run réarchivé (nouvelle tentative de la tâche) remplace ses artefacts
+        orphan_candidates(conn, "run_id = ?", (run_id,))
+        conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+        conn.execute("INSERT INTO runs (run_id, run_date, created_at) VALUES (?, ?, ?)",
+                     (run_id, run_date, datetime.now().isoformat(timespec="seconds")))
+        for path in files:
+            sha256, stored = put_object(conn, path)
+            conn.execute("INSERT INTO artifacts (run_id, path, sha256) VALUES (?, ?, ?)",
+                         (run_id, os.path.relpath(path, source_dir).replace(os.sep, "/"), sha256))
+            total += os.path.getsize(path)
+            added += stored
+            new_objects += stored > 0
+    conn.close()
+    print(f"  {len(files)} fichiers ({total / 1024 / 1024:.1f} Mo), {new_objects} nouveaux contenus")
+    print(f"  Ajouté à l'archive : {added / 1024 / 1024:.2f} Mo "
+          f"({len(files) - new_objects} fichiers dédupliqués)")
+    return {"run_id": run_id, "files": len(files), "bytes": total, "stored_bytes": added}
+
+
+def list_runs(run_date=None):
+    conn = connect()
+    query = """
+        SELECT r.run_date, r.run_id, COUNT(a.path), COALESCE(SUM(o.size), 0)
+        FROM runs r
+        LEFT JOIN artifacts a ON a.run_id = r.run_id
+        LEFT JOIN objects o ON o.sha256 = a.sha256
+        {where}
+        GROUP BY r.run_id ORDER BY r.run_date DESC, r.run_id DESC
+    """
+    if run_date:
+        rows = conn.execute(query.format(where="WHERE r.run_date = ?"), (run_date,)).fetchall()
+    else:
+        rows = conn.execute(query.format(where="")).fetchall()
+    stored, size, count = conn.execute(
+        "SELECT COALESCE(SUM(stored_size), 0), COALESCE(SUM(size), 0), COUNT(*) FROM objects").fetchone()
+    conn.close()
+    for run_date, run_id, files, total in rows:
+        print(f"  {run_date}  {run_id:<20} {files:>4} fichiers  {total / 1024 / 1024:>8.1f} Mo")
+    print(f"\n  {len(rows)} runs ; {count} objets, {stored / 1024 / 1024:.1f} Mo stockés "
+          f"pour {size / 1024 / 1024:.1f} Mo de contenus distincts")
+    return rows
+
+
+def show_run(run_id):
+    conn = connect()
+    rows = conn.execute("""
+        SELECT a.path, o.size, o.stored_size, o.codec, a.sha256
+        FROM artifacts a JOIN objects o ON o.sha256 = a.sha256
+        WHERE a.run_id = ? ORDER BY a.path
+    """, (run_id,)).fetchall()
+    conn.close()
+    for path, size, stored, codec, sha256 in rows:
+        print(f"  {path:<50} {size / 1024:>10.1f} Kio -> {stored / 1024:>8.1f} Kio ({codec}) {sha256[:12]}")
+    return rows
+
+
+def stream_object(conn, sha256, out):
+    """Décompresse un objet par blocs vers le flux binaire out"""
+    codec = conn.execute("SELECT codec FROM objects WHERE sha256 = ?", (sha256,)).fetchone()[0]
+    with open(object_path(sha256), "rb") as fin:
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("objet compressé en zstd : installer le module zstandard")
+            zstandard.ZstdDecompressor().copy_stream(fin, out)
+            return
+        decompressor = zlib.decompressobj()
+        for block in iter(lambda: fin.read(BLOCK_SIZE), b""):
+            out.write(decompressor.decompress(block))
+        out.write(decompressor.flush())
+
+
+def _artifacts(conn, run_id, pattern="*"):
+    rows = conn.execute("SELECT path, sha256 FROM artifacts WHERE run_id = ? ORDER BY path", (run_id,)).fetchall()
+    return [(path, sha256) for path, sha256 in rows if fnmatch.fnmatch(path, pattern)]
+
+
+def get_artifact(run_id, path, output=None):
+    conn = connect()
+    found = _artifacts(conn, run_id, path)
+    if not found:
+        conn.close()
+        print(f"  [WARN] {path} absent du run {run_id}", file=sys.stderr)
+        return False
+    if output:
+        with open(output, "wb") as out:
+            stream_object(conn, found[0][1], out)
+    else:
+        stream_object(conn, found[0][1], sys.stdout.buffer)
+    conn.close()
+    return True
+
+
+def restore_run(run_id, destination, pattern="*"):
+    conn = connect()
+    found = _artifacts(conn, run_id, pattern)
+    for path, sha256 in found:
+        target = os.path.join(destination, *path.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as out:
+            stream_object(conn, sha256, out)
+    conn.close()
+    print(f"  {len(found)} fichiers restaurés dans {destination}")
+    return len(found)
+
+
+def orphan_candidates(conn, where, params):
+    """Met en file les objets référencés par les artefacts sélectionnés (revérifiés par compact)"""
+    conn.execute(f"INSERT OR IGNORE INTO orphans (sha256) SELECT DISTINCT sha256 FROM artifacts WHERE {where}",
+                 params)
+
+
+def prune(keep_days=RETENTION_DAYS):
+    """Supprime les runs de plus de keep_days jours ; leurs objets sont mis en file pour compact"""
+    cutoff = (date.today() - timedelta(days=keep_days)).isoformat()
+    conn = connect()
+    with conn:
+        orphan_candidates(conn, "run_id IN (SELECT run_id FROM runs WHERE run_date < ?)", (cutoff,))
+        removed = conn.execute("DELETE FROM runs WHERE run_date < ?", (cutoff,)).rowcount
+    conn.close()
+    print(f"  Rétention {keep_days} jours : {removed} runs antérieurs au {cutoff} supprimés")
+    return removed
+
+
+def compact(limit=COMPACT_LIMIT):
+    """Supprime au plus limit objets de la file qui ne sont plus référencés par aucun run"""
+    conn = connect()
+    candidates = [row[0] for row in conn.execute("SELECT sha256 FROM orphans LIMIT ?", (limit,))]
+    freed, deleted = 0, 0
+    for sha256 in candidates:
+        with conn:
+            conn.execute("DELETE FROM orphans WHERE sha256 = ?", (sha256,))
+            if conn.execute("SELECT 1 FROM artifacts WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone():
+                continue
+            row = conn.execute("SELECT stored_size FROM objects WHERE sha256 = ?", (sha256,)).fetchone()
+            conn.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+        if row and os.path.exists(object_path(sha256)):
+            os.remove(object_path(sha256))
+            freed += row[0]
+            deleted += 1
+    remaining = conn.execute("SELECT COUNT(*) FROM orphans").fetchone()[0]
+    conn.close()
+    print(f"  Compactage : {deleted} objets supprimés ({freed / 1024 / 1024:.1f} Mo), {remaining} en attente")
+    return deleted, remaining
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive des rapports adressée par contenu")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("archive", help="Archive les rapports de reports/")
+    p.add_argument("--run-id", help="Identifiant du run (défaut : horodatage)")
+    p.add_argument("--date", help="Date du run AAAA-MM-JJ (défaut : aujourd'hui)")
+    p.add_argument("--source", default=REPORT_DIR)
+
+    p = commands.add_parser("list", help="Liste les runs archivés")
+    p.add_argument("--date")
+
+    p = commands.add_parser("show", help="Artefacts d'un run")
+    p.add_argument("run_id")
+
+    p = commands.add_parser("get", help="Extrait un artefact (sortie standard par défaut)")
+    p.add_argument("run_id")
+    p.add_argument("path")
+    p.add_argument("-o", "--output")
+
+    p = commands.add_parser("restore", help="Restaure les artefacts d'un run dans un dossier")
+    p.add_argument("run_id")
+    p.add_argument("destination")
+    p.add_argument("--pattern", default="*")
+
+    p = commands.add_parser("prune", help="Applique la rétention")
+    p.add_argument("--keep-days", type=int, default=RETENTION_DAYS)
+
+    p = commands.add_parser("compact", help="Supprime par lots les objets non référencés")
+    p.add_argument("--limit", type=int, default=COMPACT_LIMIT)
+
+    args = parser.parse_args()
+    if args.command == "archive":
+        if archive_run(args.run_id, args.date, args.source) is None:
+            sys.exit(1)
+    elif args.command == "list":
+        list_runs(args.date)
+    elif args.command == "show":
+        show_run(args.run_id)
+    elif args.command == "get":
+        if not get_artifact(args.run_id, args.path, args.output):
+            sys.exit(1)
+    elif args.command == "restore":
+        restore_run(args.run_id, args.destination, args.pattern)
+    elif args.command == "prune":
+        prune(args.keep_days)
+    elif args.command == "compact":
+        compact(args.limit)
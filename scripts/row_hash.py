@@ -0,0 +1,79 @@
+"""
+Empreinte 64 bits des lignes brutes (colonne row_hash de {prefix}_raw)
+Chaque ligne est normalisée sous la forme stockée par MariaDB (entiers, DECIMAL(10, 2),
+dates ISO, NULL explicite), puis hachée colonne par colonne de façon vectorisée.
+La déduplication exacte devient une comparaison d'entiers (ou une requête sur l'index
+idx_row_hash) au lieu d'un hachage d'objets Python sur les 11 colonnes.
+"""
+import pandas as pd
+import numpy as np
+
+COLUMNS = [
+    "Transaction_ID", "Customer_ID", "Customer_Name", "Product_Category",
+    "Product_Name", "Unit_Price", "Quantity", "Total_Amount",
+    "Payment_Method", "City", "Transaction_Date"
+]
+INTEGER_COLUMNS = ("Transaction_ID", "Quantity")
+DECIMAL_COLUMNS = ("Unit_Price", "Total_Amount")
+DATE_COLUMNS = ("Transaction_Date",)
+NULL = "\x00"
+
+# Ordre de lecture de {prefix}_raw avant déduplication (nettoyage et différentiel) : load_seq
+# (AUTO_INCREMENT, migration V007) suit l'ordre d'insertion, même au sein d'un chargement
+RAW_ORDER = "Transaction_ID, load_seq"
+
+
+def _canonical(series, column):
+    """Représentation texte canonique d'une colonne, identique qu'elle vienne du CSV ou de la base"""
+    if column in INTEGER_COLUMNS:
+        values = pd.to_numeric(series, errors="coerce").round().astype("Int64")
+        return values.astype(str).where(values.notna(), NULL)
+    if column in DECIMAL_COLUMNS:
+        values = pd.to_numeric(series, errors="coerce")
+        # Arrondi DECIMAL(10, 2) de MariaDB (demi-valeur éloignée de zéro)
+        values = np.sign(values) * np.floor(values.abs() * 100 + 0.5 + 1e-9) / 100
+        return values.map("{:.2f}".format).where(values.notna(), NULL)
+    if column in DATE_COLUMNS:
+        parsed = pd.to_datetime(series, errors="coerce")
+        text = parsed.dt.strftime("%Y-%m-%d")
+        # Une date illisible reste distinguable d'un NULL
+        return text.fillna(series.astype(str)).where(series.notna(), NULL)
+    return series.astype(str).where(series.notna(), NULL)
+
+
+def row_hashes(df, columns=COLUMNS):
+    """Empreinte uint64 de chaque ligne sur les colonnes métier (loaded_at, load_seq et row_hash exclus)"""
+    canonical = pd.DataFrame({c: _canonical(df[c], c) for c in columns}, index=df.index)
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy(dtype=np.uint64)
+
+
+def with_row_hash(df):
+    """Copie du DataFrame avec la colonne row_hash (entiers Python, insérables tels quels par pymysql)"""
+    df = df.copy()
+    df["row_hash"] = pd.Series([int(h) for h in row_hashes(df)], index=df.index, dtype=object)
+    return df
+
+
+def existing_hashes(conn, table, hashes, chunk_size=1000):
+    """Empreintes déjà présentes dans la table (recherche sur l'index idx_row_hash)"""
+    hashes = [int(h) for h in np.unique(np.asarray(hashes, dtype=np.uint64))]
+    found = set()
+    cursor = conn.cursor()
+    for start in range(0, len(hashes), chunk_size):
+        chunk = hashes[start:start + chunk_size]
+        cursor.execute(
+            f"SELECT DISTINCT row_hash FROM {table} WHERE row_hash IN ({', '.join(['%s'] * len(chunk))})", chunk
+        )
+        found.update(int(row[0]) for row in cursor.fetchall())
+    return found
+
+
+def duplicate_counts(conn, table):
+    """Doublons exacts et doublons de Transaction_ID, calculés par MariaDB sur les index"""
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT COUNT(*) - COUNT(DISTINCT row_hash), COUNT(Transaction_ID) - COUNT(DISTINCT Transaction_ID) "
+        f"FROM {table}"
+    )
+    exact, key = cursor.fetchone()
+    return int(exact), int(key)
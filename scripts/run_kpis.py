@@ -1,5 +1,11 @@
 import pymysql
+import argparse
 import os
+import sys
+from datasets import DEFAULT_DATASET, get_dataset
+from pipeline_metrics import stage_timer
+from profiling import profiled
+from quality_counters import derive_kpis
 
 DB_HOST = "localhost"
 DB_PORT = 3307
@@ -7,18 +13,42 @@ DB_USER = "dq_user"
 DB_PASSWORD = "dq_password"
 DB_NAME = "data_quality"
 
-SQL_FILE = r"c:\Users\idirt\OneDrive\Bureau\Mabrouk Hannachi\data-quality-pipeline\sql\quality_kpis.sql"
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SQL_FILE = os.path.join(PROJECT_DIR, "sql", "quality_kpis.sql")
 
-def run_kpis():
-    print("--- CALCUL DES KPIs (RETAIL) ---")
+def run_kpis(dataset=DEFAULT_DATASET, full=False):
+    ds = get_dataset(dataset)
+    with stage_timer(ds["name"], "kpis") as run:
+        run["rows"], run["score"] = _run_kpis(ds, full)
+        if run["rows"] is None:
+            run["status"] = "failed"
+    return run["rows"] is not None
+
+def _run_kpis(ds, full=False):
+    print(f"--- CALCUL DES KPIs ({ds['name'].upper()}) ---")
+
+    if not full:
+        try:
+            conn = pymysql.connect(host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, database=DB_NAME)
+            derived = derive_kpis(conn, ds)
+            conn.close()
+        except Exception as e:
+            print(f"Database connection error: {e}")
+            return None, None
+        if derived is not None:
+            print(f"Success: KPIs derived from load counters ({derived[0]} rows, no table scan).")
+            return derived
+        print("No load counters for this dataset, falling back to a full recompute.")
     
     # 1. Read SQL File
     if not os.path.exists(SQL_FILE):
         print(f"Error: SQL file not found at {SQL_FILE}")
-        return
+        return None, None
         
     with open(SQL_FILE, 'r') as f:
         sql_content = f.read()
+    # Le fichier SQL cible retail_raw ; on le redirige vers la table brute du dataset
+    sql_content = sql_content.replace("FROM retail_raw", f"FROM {ds['raw_table']}")
         
     # 2. Split into statements (semicolon)
     statements = sql_content.split(';')
@@ -27,6 +57,7 @@ def run_kpis():
     try:
         conn = pymysql.connect(host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, database=DB_NAME)
         cursor = conn.cursor()
+        cursor.execute("SET @dq_dataset = %s", (ds["name"],))
         
         print(f"Connected to {DB_NAME}. Executing statements...")
         
@@ -43,10 +74,28 @@ def run_kpis():
         print(f"Success: Executed {count} SQL statements.")
         print("Metrics tables (quality_metrics, quality_scores_history) should now be populated.")
         
+        cursor.execute(
+            "SELECT global_score, (SELECT COUNT(*) FROM " + ds["raw_table"] + ") FROM quality_scores_history "
+            "WHERE dataset = %s AND report_date = CURRENT_DATE() ORDER BY id DESC LIMIT 1",
+            (ds["name"],)
+        )
+        row = cursor.fetchone()
         conn.close()
+        if row is None:
+            return 0, None
+        return int(row[1]), None if row[0] is None else float(row[0])
         
     except Exception as e:
         print(f"Database connection error: {e}")
+        return None, None
 
 if __name__ == "__main__":
-    run_kpis()
+    parser = argparse.ArgumentParser(description="Calcul des KPIs qualité d'un dataset")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--full", action="store_true", help="Recalcule les KPIs sur toute la table brute (sans compteurs)")
+    parser.add_argument("--profile", action="store_true", help="Profil CPU/allocations dans reports/profiles/")
+    args = parser.parse_args()
+    with profiled(f"kpis_{args.dataset}", args.profile):
+        ok = run_kpis(args.dataset, full=args.full)
+    if not ok:
+        sys.exit(1)
@@ -0,0 +1,355 @@
+"""
+Mode micro-batch : surveillance de data/raw
+Chaque nouveau CSV déposé est importé (ajout dans {prefix}_raw), nettoyé, publié
+dans {prefix}_cleaned, validé sur les seules partitions mensuelles qu'il touche
+(cache de validation) puis les KPIs sont rafraîchis. Comme le nettoyage nocturne, qui
+garde la première occurrence d'un Transaction_ID, un Transaction_ID déjà publié n'est
+pas remplacé par un dépôt ultérieur. Un registre (stream_ledger) garantit qu'un fichier n'est
+traité qu'une seule fois : il est écrit dans la même transaction que les données.
+Les fichiers traités sont archivés dans data/raw/processed ; l'import nocturne les y
+recharge (registre à l'appui) après le CSV principal, sans quoi ils seraient perdus.
+La file d'attente est bornée : quand elle est pleine, la découverte de fichiers est
+suspendue (backpressure). Les latences de chaque batch sont écrites dans
+reports/stream_metrics.jsonl et dans pipeline_runs.
+Usage: python scripts/stream_watcher.py [--dataset retail] [--poll 1.0] [--queue-size 16] [--once]
+"""
+import pandas as pd
+import pymysql
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import queue
+import shutil
+import signal
+import threading
+import time
+from datetime import datetime
+from cleaning_pipeline import clean_dataframe
+from datasets import DEFAULT_DATASET, get_dataset, list_datasets, ensure_tables
+from great_expectations_validator import expectation_specs, resolve_specs, suite_parameters
+from pipeline_metrics import record_stage
+from quality_counters import counters_initialized, ensure_counter_tables, record_load
+from row_hash import with_row_hash, existing_hashes
+from run_kpis import _run_kpis
+from validation_cache import partitions_of, validate_incremental
+
+DB_CONFIG = {
+    "host": "localhost",
+    "port": 3307,
+    "user": "dq_user",
+    "password": "dq_password",
+    "database": "data_quality"
+}
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WATCH_DIR = os.path.join(PROJECT_DIR, "data", "raw")
+METRICS_PATH = os.path.join(PROJECT_DIR, "reports", "stream_metrics.jsonl")
+
+COLS = [
+    "Transaction_ID", "Customer_ID", "Customer_Name", "Product_Category",
+    "Product_Name", "Unit_Price", "Quantity", "Total_Amount",
+    "Payment_Method", "City", "Transaction_Date"
+]
+
+CREATE_LEDGER = """
+    CREATE TABLE IF NOT EXISTS stream_ledger (
+        file_sha256 CHAR(64) PRIMARY KEY,
+        dataset VARCHAR(50) NOT NULL,
+        file_name VARCHAR(255) NOT NULL,
+        rows_loaded INT NOT NULL,
+        rows_published INT NOT NULL,
+        processed_at DATETIME NOT NULL
+    )
+"""
+
+
+def records(df, cols=COLS):
+    """Lignes du DataFrame en tuples, NaN convertis en NULL"""
+    values = df[cols].astype(object)
+    return list(values.where(values.notna(), None).itertuples(index=False, name=None))
+
+
+def already_processed(conn, digest):
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM stream_ledger WHERE file_sha256 = %s", (digest,))
+    return cursor.fetchone() is not None
+
+
+def publish_batch(conn, ds, path, digest, raw, cleaned, counted=True):
+    """Ajout brut + publication nettoyée + compteurs qualité + entrée du registre, dans une seule transaction.
+
+    Retourne le nb de lignes nettoyées publiées (nouveaux Transaction_ID).
+    """
+    placeholders = ", ".join(["%s"] * len(COLS))
+    raw_cols = COLS + ["row_hash"]
+    cursor = conn.cursor()
+    try:
+        conn.begin()
+        cursor.executemany(
+            f"INSERT INTO {ds['raw_table']} ({', '.join(raw_cols)}) VALUES ({', '.join(['%s'] * len(raw_cols))})",
+            records(raw, raw_cols)
+        )
+        # Première occurrence conservée, comme la déduplication du nettoyage nocturne : une clé
+        # déjà publiée est laissée telle quelle (mise à jour sans effet, rowcount 0)
+        cursor.executemany(
+            f"INSERT INTO {ds['cleaned_table']} ({', '.join(COLS)}) VALUES ({placeholders}) "
+            f"ON DUPLICATE KEY UPDATE Transaction_ID = Transaction_ID", records(cleaned)
+        )
+        published = cursor.rowcount
+        if counted:
+            record_load(conn, ds, raw, os.path.basename(path))
+        # Clé primaire sur l'empreinte : un second traitement du même fichier échoue et annule tout
+        cursor.execute(
+            "INSERT INTO stream_ledger (file_sha256, dataset, file_name, rows_loaded, rows_published, processed_at) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (digest, ds["name"], os.path.basename(path), len(raw), published, datetime.now())
+        )
+        conn.commit()
+        return published
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def archive_file(path, status):
+    """Déplace le fichier traité dans data/raw/processed (ou failed)"""
+    target_dir = os.path.join(os.path.dirname(path), status)
+    os.makedirs(target_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    shutil.move(path, os.path.join(target_dir, f"{stamp}_{os.path.basename(path)}"))
+
+
+class StreamWatcher:
+    """Découverte des fichiers (thread de polling) et traitement séquentiel des batchs"""
+
+    def __init__(self, dataset, watch_dir=WATCH_DIR, poll=1.0, queue_size=16, kpi_interval=10.0):
+        self.ds = get_dataset(dataset)
+        self.watch_dir = watch_dir
+        self.poll = poll
+        self.kpi_interval = kpi_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stop = threading.Event()
+        self.feed_done = threading.Event()
+        self.pending = set()
+        self.sizes = {}
+        self.last_kpis = 0.0
+        self.kpis_stale = False
+        self.latencies = []
+        # Les CSV sources des traitements nocturnes ne sont pas des dépôts micro-batch
+        self.ignored = {os.path.abspath(d["csv_path"]) for d in list_datasets().values()}
+        self.specs = expectation_specs()
+        self.conn = None
+        self.cleaned_created = None
+
+    def discover(self):
+        """Fichiers stables (taille et date inchangées depuis le dernier passage), du plus ancien au plus récent"""
+        ready = []
+        seen = {}
+        for path in glob.glob(os.path.join(self.watch_dir, "*.csv")):
+            path = os.path.abspath(path)
+            if path in self.ignored or path in self.pending:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            seen[path] = (stat.st_size, stat.st_mtime)
+            if self.sizes.get(path) == seen[path]:
+                ready.append((stat.st_mtime, path))
+        self.sizes = seen
+        return [path for _, path in sorted(ready)]
+
+    def enqueue(self, paths):
+        for path in paths:
+            # Backpressure : on attend une place dans la file plutôt que d'accumuler en mémoire
+            while not self.stop.is_set():
+                try:
+                    self.queue.put((path, time.perf_counter()), timeout=self.poll)
+                    self.pending.add(path)
+                    break
+                except queue.Full:
+                    print(f"  [BACKPRESSURE] File d'attente pleine ({self.queue.maxsize}), découverte suspendue")
+
+    def poller(self, once=False):
+        if once:
+            # Deux passages suffisent à considérer les fichiers présents comme stables
+            self.discover()
+            self.enqueue(self.discover())
+            self.feed_done.set()
+            return
+        while not self.stop.is_set():
+            self.enqueue(self.discover())
+            self.stop.wait(self.poll)
+
+    def prepare(self):
+        """DDL une fois au démarrage (registre, tables du dataset, compteurs) et empreintes complètes"""
+        self.conn = pymysql.connect(**DB_CONFIG)
+        self.conn.cursor().execute(CREATE_LEDGER)
+        ensure_tables(self.conn, self.ds)
+        ensure_counter_tables(self.conn)
+        # Les batchs suivants ne ré-empreintent que leurs partitions
+        self.cleaned_created = self.cleaned_table_created()
+        validate_incremental(self.conn, resolve_specs(self.specs, suite_parameters()), table=self.ds["cleaned_table"])
+
+    def cleaned_table_created(self):
+        """Date de création de la table nettoyée : elle change quand le nettoyage nocturne la republie"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT CREATE_TIME FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (self.ds["cleaned_table"],)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def process(self, path, enqueued_at):
+        """Traite un fichier ; retourne les mesures de latence du batch"""
+        metrics = {"file": os.path.basename(path), "dataset": self.ds["name"],
+                   "started_at": datetime.now().isoformat(timespec="seconds"),
+                   "queue_wait_s": round(time.perf_counter() - enqueued_at, 3)}
+        start = time.perf_counter()
+
+        with open(path, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        conn = self.conn
+        conn.ping(reconnect=True)
+        # Sans compteurs initialisés (import complet ou --rebuild), les KPIs sont recalculés en entier
+        counted = counters_initialized(conn, self.ds)
+        if already_processed(conn, digest):
+            metrics["status"] = "duplicate"
+            return metrics
+
+        step = time.perf_counter()
+        raw = pd.read_csv(io.BytesIO(content))
+        missing = [c for c in COLS if c not in raw.columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes : {missing}")
+        raw = with_row_hash(raw)
+        # Lignes déjà chargées par un dépôt précédent : recherche sur l'index row_hash
+        metrics["rows_already_loaded"] = int(
+            raw["row_hash"].isin(existing_hashes(conn, self.ds["raw_table"], raw["row_hash"])).sum()
+        )
+        metrics["read_s"] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        cleaned, _ = clean_dataframe(raw.copy(), {"steps": []})
+        metrics["clean_s"] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        published = publish_batch(conn, self.ds, path, digest, raw, cleaned, counted)
+        metrics["publish_s"] = round(time.perf_counter() - step, 3)
+        metrics["rows_loaded"], metrics["rows_published"] = len(raw), published
+
+        # Seules les partitions mensuelles des lignes du batch sont ré-empreintées et revalidées
+        # (les lignes déjà publiées ne sont pas modifiées), sauf si la table a été republiée
+        step = time.perf_counter()
+        touched = partitions_of(cleaned["Transaction_Date"])
+        created = self.cleaned_table_created()
+        if created != self.cleaned_created:
+            touched, self.cleaned_created = None, created
+        successes, _, cache_stats = validate_incremental(
+            conn, resolve_specs(self.specs, suite_parameters()), table=self.ds["cleaned_table"], touched=touched
+        )
+        metrics["validate_s"] = round(time.perf_counter() - step, 3)
+        metrics["partitions_recomputed"] = cache_stats["recomputed"]
+        metrics["failed_expectations"] = [k for k, ok in successes.items() if not ok]
+
+        self.kpis_stale = True
+        metrics["status"] = "success"
+        metrics["latency_s"] = round(time.perf_counter() - start, 3)
+        return metrics
+
+    def refresh_kpis(self, force=False):
+        """Rafraîchit les KPIs quand la file est vide ou au plus tard toutes les kpi_interval secondes"""
+        if not self.kpis_stale:
+            return None
+        if not force and not self.queue.empty() and time.perf_counter() - self.last_kpis < self.kpi_interval:
+            return None
+        step = time.perf_counter()
+        _run_kpis(self.ds)
+        self.last_kpis = time.perf_counter()
+        self.kpis_stale = False
+        return round(self.last_kpis - step, 3)
+
+    def emit(self, metrics, enqueued_at):
+        metrics["end_to_end_s"] = round(time.perf_counter() - enqueued_at, 3)
+        os.makedirs(os.path.dirname(METRICS_PATH), exist_ok=True)
+        with open(METRICS_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(metrics, ensure_ascii=False) + "\n")
+        if metrics["status"] != "duplicate":
+            record_stage(self.ds["name"], "stream_batch", datetime.fromisoformat(metrics["started_at"]),
+                         metrics["end_to_end_s"], metrics.get("rows_published"), status=metrics["status"])
+        if metrics["status"] == "success":
+            self.latencies.append(metrics["end_to_end_s"])
+        print(f"  [{metrics['status'].upper()}] {metrics['file']} : {metrics.get('rows_published', 0)} lignes, "
+              f"latence {metrics['end_to_end_s']}s (attente {metrics['queue_wait_s']}s)")
+
+    def consumer(self):
+        while not self.stop.is_set():
+            try:
+                path, enqueued_at = self.queue.get(timeout=self.poll)
+            except queue.Empty:
+                if self.feed_done.is_set():
+                    break
+                continue
+            try:
+                metrics = self.process(path, enqueued_at)
+                archive_file(path, "processed")
+            except Exception as e:
+                metrics = {"file": os.path.basename(path), "dataset": self.ds["name"],
+                           "started_at": datetime.now().isoformat(timespec="seconds"),
+                           "queue_wait_s": 0.0, "status": "failed", "error": str(e)}
+                print(f"  ERREUR {os.path.basename(path)} : {e}")
+                archive_file(path, "failed")
+            finally:
+                self.pending.discard(path)
+                self.queue.task_done()
+            try:
+                kpi_s = self.refresh_kpis()
+                if kpi_s is not None:
+                    metrics["kpi_s"] = kpi_s
+            except Exception as e:
+                print(f"  [WARN] Rafraîchissement des KPIs impossible : {e}")
+            self.emit(metrics, enqueued_at)
+
+    def run(self, once=False):
+        print("=" * 60)
+        print(f"MODE MICRO-BATCH ({self.ds['name'].upper()})")
+        print("=" * 60)
+        print(f"\nSurveillance de {self.watch_dir} (polling {self.poll}s, file max {self.queue.maxsize})")
+        self.prepare()
+        poller = threading.Thread(target=self.poller, args=(once,), daemon=True)
+        poller.start()
+        try:
+            self.consumer()
+        finally:
+            self.stop.set()
+            poller.join()
+            self.conn.close()
+        if self.kpis_stale:
+            self.refresh_kpis(force=True)
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+            print(f"\n{len(ordered)} batchs : latence p50 {ordered[len(ordered) // 2]}s, p95 {p95}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Traitement micro-batch des CSV déposés dans data/raw")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--watch-dir", default=WATCH_DIR)
+    parser.add_argument("--poll", type=float, default=1.0, help="Intervalle de polling (s)")
+    parser.add_argument("--queue-size", type=int, default=16, help="Taille max de la file d'attente")
+    parser.add_argument("--kpi-interval", type=float, default=10.0,
+                        help="Délai max entre deux rafraîchissements des KPIs sous charge (s)")
+    parser.add_argument("--once", action="store_true", help="Traite les fichiers présents puis s'arrête")
+    args = parser.parse_args()
+
+    watcher = StreamWatcher(args.dataset, args.watch_dir, args.poll, args.queue_size, args.kpi_interval)
+    # Arrêt propre : le batch en cours se termine, les fichiers en file seront repris au prochain lancement
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: watcher.stop.set())
+    watcher.run(once=args.once)
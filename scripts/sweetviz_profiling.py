@@ -1,7 +1,9 @@
 import sweetviz as sv
 import pandas as pd
 import pymysql
+import argparse
 import os
+from profiling import profiled
 
 DB_HOST = "localhost"
 DB_PORT = 3307
@@ -18,7 +20,7 @@ def generate_reports():
     conn = pymysql.connect(host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD, database=DB_NAME)
     
     print("Loading retail_raw...")
-    df_raw = pd.read_sql("SELECT * FROM retail_raw", conn)
+    df_raw = pd.read_sql("SELECT * FROM retail_raw", conn).drop(columns=["row_hash"], errors="ignore")
     
     print("Loading retail_cleaned...")
     df_cleaned = pd.read_sql("SELECT * FROM retail_cleaned", conn)
@@ -40,4 +42,8 @@ def generate_reports():
     print(f"\nRapports générés :\n  - {raw_path}\n  - {compare_path}")
 
 if __name__ == "__main__":
-    generate_reports()
+    parser = argparse.ArgumentParser(description="Rapports Sweetviz brut / nettoyé")
+    parser.add_argument("--profile", action="store_true", help="Profil CPU/allocations dans reports/profiles/")
+    args = parser.parse_args()
+    with profiled("sweetviz", args.profile):
+        generate_reports()
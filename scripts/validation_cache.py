@@ -0,0 +1,300 @@
+"""
+Cache de validation par partition
+Découpe retail_cleaned en partitions mensuelles (Transaction_Date), calcule une empreinte
+de chaque partition côté MariaDB et met en cache les résultats partiels de chaque expectation
+(nb d'échecs, min/max, clés triées compressées et clés répétées pour l'unicité), indexés par
+empreinte de partition + hash de configuration de l'expectation.
+Seules les partitions modifiées sont relues ; la fusion donne le même résultat qu'un calcul complet.
+Les empreintes sont conservées avec les partiels : le mode micro-batch ne ré-empreinte
+que les partitions touchées par un batch.
+"""
+import pandas as pd
+import numpy as np
+import base64
+import hashlib
+import json
+import os
+import zlib
+from datetime import date
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(PROJECT_DIR, "great_expectations", "cache")
+
+TABLE = "retail_cleaned"
+PARTITION_COLUMN = "Transaction_Date"
+NULL_PARTITION = "NULL"
+# Format des partiels : toute évolution invalide les entrées existantes du cache
+PARTIAL_VERSION = 3
+
+
+# Expectations dont le partiel (min/max) ne dépend pas des bornes : elles sont
+# exclues du hash, sinon E14 (max_value = aujourd'hui) invaliderait tout le cache chaque jour.
+BOUNDS_ONLY_TYPES = ("ExpectColumnValueLengthsToBeBetween", "ExpectColumnValuesToBeBetween")
+
+
+def config_hash(spec):
+    """Hash stable du type et des paramètres d'une expectation qui influent sur le partiel"""
+    kwargs = spec["kwargs"]
+    if spec["type"] in BOUNDS_ONLY_TYPES:
+        kwargs = {k: v for k, v in kwargs.items() if k not in ("min_value", "max_value")}
+    payload = json.dumps({"type": spec["type"], "kwargs": kwargs, "version": PARTIAL_VERSION},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_path(table):
+    return os.path.join(CACHE_DIR, f"{table}_partials.json")
+
+
+def table_columns(conn, table=TABLE):
+    cursor = conn.cursor()
+    cursor.execute(f"SHOW COLUMNS FROM {table}")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _partition_range(part):
+    """Bornes [début, fin[ d'une partition mensuelle 'AAAA-MM'"""
+    year, month = (int(x) for x in part.split("-"))
+    return date(year, month, 1), date(year + month // 12, month % 12 + 1, 1)
+
+
+def _partition_filter(parts):
+    """Clause WHERE (et paramètres) limitée aux partitions demandées"""
+    clauses, params = [], []
+    for part in sorted(parts):
+        if part == NULL_PARTITION:
+            clauses.append(f"{PARTITION_COLUMN} IS NULL")
+        else:
+            clauses.append(f"({PARTITION_COLUMN} >= %s AND {PARTITION_COLUMN} < %s)")
+            params.extend(_partition_range(part))
+    return "WHERE " + " OR ".join(clauses), params
+
+
+def partition_fingerprints(conn, columns, table=TABLE, parts=None):
+    """Empreinte et nb de lignes de chaque partition mensuelle, calculés entièrement en SQL.
+
+    Combine COUNT, BIT_XOR et SUM des CRC32 de chaque ligne (indépendant de l'ordre)
+    avec la liste des colonnes, pour qu'un changement de schéma invalide tout le cache.
+    parts limite le calcul à certaines partitions (index idx_transaction_date).
+    """
+    row_expr = "CONCAT_WS('|', " + ", ".join(
+        f"COALESCE(CAST({c} AS CHAR), '<null>')" for c in columns
+    ) + ")"
+    where, params = _partition_filter(parts) if parts else ("", [])
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT COALESCE(DATE_FORMAT({PARTITION_COLUMN}, '%%Y-%%m'), '{NULL_PARTITION}') AS part,
+               COUNT(*), BIT_XOR(CRC32({row_expr})), SUM(CRC32({row_expr}))
+        FROM {table}
+        {where}
+        GROUP BY part
+    """, params)
+    schema = "|".join(columns)
+    fingerprints, counts = {}, {}
+    for part, count, xor_crc, sum_crc in cursor.fetchall():
+        raw = f"{schema}:{count}:{xor_crc}:{sum_crc}"
+        fingerprints[part] = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+        counts[part] = int(count)
+    return fingerprints, counts
+
+
+def load_partition(conn, part, table=TABLE):
+    """Charge les lignes d'une seule partition"""
+    if part == NULL_PARTITION:
+        return pd.read_sql(f"SELECT * FROM {table} WHERE {PARTITION_COLUMN} IS NULL", conn)
+    start, end = _partition_range(part)
+    return pd.read_sql(
+        f"SELECT * FROM {table} WHERE {PARTITION_COLUMN} >= %s AND {PARTITION_COLUMN} < %s",
+        conn, params=(start, end)
+    )
+
+
+def partitions_of(dates):
+    """Partitions mensuelles ('AAAA-MM' ou NULL) d'une série de dates"""
+    parsed = pd.to_datetime(pd.Series(dates), errors="coerce")
+    return set(parsed.dt.strftime("%Y-%m").fillna(NULL_PARTITION))
+
+
+def _bounds(series):
+    """Min/max des valeurs non nulles (float pour les nombres, ISO pour les dates)"""
+    values = series.dropna()
+    if not len(values):
+        return None, None
+    numeric = pd.to_numeric(values, errors="coerce")
+    if numeric.notna().all():
+        return float(numeric.min()), float(numeric.max())
+    values = values.astype(str)
+    return values.min(), values.max()
+
+
+def _encode_keys(uniques):
+    """Clés uniques triées : écarts successifs compressés si entières, liste sinon"""
+    if uniques.dtype.kind in "iu":
+        deltas = np.diff(uniques.astype(np.int64), prepend=np.int64(0))
+        return {"int_deltas": base64.b64encode(zlib.compress(deltas.tobytes(), 9)).decode("ascii")}
+    return {"values": uniques.tolist()}
+
+
+def _decode_keys(encoded):
+    if "int_deltas" in encoded:
+        deltas = np.frombuffer(zlib.decompress(base64.b64decode(encoded["int_deltas"])), dtype=np.int64)
+        return np.cumsum(deltas)
+    return np.asarray(encoded["values"])
+
+
+def evaluate_partial(spec, df):
+    """Résultat partiel d'une expectation sur une partition (fusionnable)"""
+    kind, kw = spec["type"], spec["kwargs"]
+    if kind == "ExpectTableRowCountToBeBetween":
+        return {"rows": len(df)}
+    if kind == "ExpectTableColumnCountToEqual":
+        return {}  # propriété du schéma, pas des partitions (cf. validate_incremental)
+
+    column = df[kw["column"]]
+    if kind == "ExpectColumnValuesToNotBeNull":
+        return {"unexpected": int(column.isnull().sum())}
+    if kind == "ExpectColumnValuesToMatchRegex":
+        values = column.dropna().astype(str)
+        return {"unexpected": int((~values.str.contains(kw["regex"], regex=True)).sum())}
+    if kind == "ExpectColumnValuesToBeInSet":
+        return {"unexpected": int((~column.dropna().isin(kw["value_set"])).sum())}
+    if kind == "ExpectColumnValueLengthsToBeBetween":
+        lengths = column.dropna().astype(str).str.len()
+        return {"min": int(lengths.min()) if len(lengths) else None,
+                "max": int(lengths.max()) if len(lengths) else None}
+    if kind == "ExpectColumnValuesToBeBetween":
+        low, high = _bounds(column)
+        return {"min": low, "max": high}
+    if kind == "ExpectColumnValuesToBeUnique":
+        values = column.dropna().to_numpy()
+        uniques, counts = np.unique(values, return_counts=True)
+        # Clés répétées dans la partition, avec leur nb d'occurrences : la fusion les ajoute
+        # aux collisions entre partitions
+        repeated = [[v.item() if hasattr(v, "item") else v, int(n)]
+                    for v, n in zip(uniques[counts > 1], counts[counts > 1])]
+        return {"duplicates": len(repeated), "repeated": repeated, "keys": _encode_keys(uniques)}
+    raise ValueError(f"Expectation non supportée en mode incrémental : {kind}")
+
+
+def merge_partials(spec, partials):
+    """Fusionne les résultats partiels de toutes les partitions"""
+    kind = spec["type"]
+    if kind == "ExpectTableRowCountToBeBetween":
+        return {"rows": sum(p["rows"] for p in partials)}
+    if kind in BOUNDS_ONLY_TYPES:
+        mins = [p["min"] for p in partials if p["min"] is not None]
+        maxs = [p["max"] for p in partials if p["max"] is not None]
+        return {"min": min(mins) if mins else None, "max": max(maxs) if maxs else None}
+    if kind == "ExpectColumnValuesToBeUnique":
+        if not partials:
+            return {"duplicates": 0}
+        keys = np.concatenate([_decode_keys(p["keys"]) for p in partials])
+        uniques, counts = np.unique(keys, return_counts=True)
+        duplicated = set(uniques[counts > 1].tolist())
+        duplicated.update(key for p in partials for key, _ in p["repeated"])
+        return {"duplicates": len(duplicated)}
+    return {"unexpected": sum(p["unexpected"] for p in partials)}
+
+
+def is_success(spec, merged):
+    """Applique la règle de l'expectation au résultat fusionné"""
+    kind, kw = spec["type"], spec["kwargs"]
+    if kind == "ExpectTableRowCountToBeBetween":
+        return (kw.get("min_value") is None or merged["rows"] >= kw["min_value"]) and \
+               (kw.get("max_value") is None or merged["rows"] <= kw["max_value"])
+    if kind == "ExpectTableColumnCountToEqual":
+        return merged["columns"] == kw["value"]
+    if kind in BOUNDS_ONLY_TYPES:
+        if merged["min"] is None:
+            return True
+        return (kw.get("min_value") is None or merged["min"] >= kw["min_value"]) and \
+               (kw.get("max_value") is None or merged["max"] <= kw["max_value"])
+    if kind == "ExpectColumnValuesToBeUnique":
+        return merged["duplicates"] == 0
+    return merged["unexpected"] == 0
+
+
+def load_cache(path):
+    """Cache : {"partitions": {partition: [empreinte, nb lignes]}, "entries": {clé: partiel}}"""
+    if not os.path.exists(path):
+        return {"partitions": {}, "entries": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            cache = json.load(f)
+        except ValueError:
+            return {"partitions": {}, "entries": {}}
+    if "entries" not in cache:  # ancien format : partiels seuls
+        return {"partitions": {}, "entries": cache}
+    return cache
+
+
+def save_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def validate_incremental(conn, specs, table=TABLE, touched=None):
+    """Valide en réutilisant les partiels des partitions inchangées.
+
+    touched : partitions modifiées depuis la dernière validation (mode micro-batch). Seules
+    celles-ci sont ré-empreintées ; les autres reprennent l'empreinte enregistrée lors de
+    la validation précédente. Sans empreintes enregistrées, toutes les partitions sont calculées.
+    Retourne (succès par id d'expectation, nb de lignes, statistiques du cache).
+    """
+    path = cache_path(table)
+    cache = load_cache(path)
+    columns = table_columns(conn, table)
+    if touched is not None and cache["partitions"]:
+        print(f"📊 Empreintes de {len(touched)} partitions modifiées de {table}...")
+        fingerprints = {p: v[0] for p, v in cache["partitions"].items() if p not in touched}
+        counts = {p: v[1] for p, v in cache["partitions"].items() if p not in touched}
+        fresh_fps, fresh_counts = partition_fingerprints(conn, columns, table, parts=touched)
+        fingerprints.update(fresh_fps)
+        counts.update(fresh_counts)
+    else:
+        print(f"📊 Empreintes des partitions de {table}...")
+        fingerprints, counts = partition_fingerprints(conn, columns, table)
+    hashes = {spec["id"]: config_hash(spec) for spec in specs}
+
+    fresh = {}
+    recomputed = []
+    for part, fp in sorted(fingerprints.items()):
+        missing = [s for s in specs if f"{fp}:{hashes[s['id']]}" not in cache["entries"]]
+        if not missing:
+            continue
+        df = load_partition(conn, part, table)
+        recomputed.append(part)
+        for spec in missing:
+            fresh[f"{fp}:{hashes[spec['id']]}"] = evaluate_partial(spec, df)
+
+    # On ne garde que les entrées encore valides (partitions et configurations actuelles)
+    live_keys = {f"{fp}:{h}" for fp in fingerprints.values() for h in hashes.values()}
+    entries = {k: v for k, v in {**cache["entries"], **fresh}.items() if k in live_keys}
+    save_cache(path, {
+        "partitions": {p: [fp, counts[p]] for p, fp in fingerprints.items()},
+        "entries": entries,
+    })
+
+    successes = {}
+    for spec in specs:
+        if spec["type"] == "ExpectTableColumnCountToEqual":
+            # Lu sur le schéma : une table vide a toujours ses colonnes
+            merged = {"columns": len(columns)}
+        else:
+            merged = merge_partials(spec, [entries[f"{fp}:{hashes[spec['id']]}"] for fp in fingerprints.values()])
+        successes[spec["id"]] = bool(is_success(spec, merged))
+    row_count = sum(counts.values())
+
+    print(f"   → {len(fingerprints)} partitions, {len(recomputed)} recalculées, "
+          f"{len(fingerprints) - len(recomputed)} servies par le cache")
+
+    stats = {
+        "partitions": len(fingerprints),
+        "recomputed": len(recomputed),
+        "recomputed_partitions": recomputed,
+    }
+
+    return successes, row_count, stats
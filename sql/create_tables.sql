@@ -14,7 +14,15 @@ CREATE TABLE retail_raw (
     Payment_Method VARCHAR(50),
     City VARCHAR(50),
     Transaction_Date DATE,
-    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    row_hash BIGINT UNSIGNED,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    load_seq BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    INDEX idx_load_seq (load_seq),
+    INDEX idx_transaction_id_seq (Transaction_ID, load_seq),
+    INDEX idx_row_hash (row_hash),
+    INDEX idx_transaction_id (Transaction_ID),
+    INDEX idx_loaded_at (loaded_at),
+    INDEX idx_transaction_date (Transaction_Date)
 );
 
 DROP TABLE IF EXISTS retail_cleaned;
@@ -29,12 +37,14 @@ CREATE TABLE retail_cleaned (
     Total_Amount DECIMAL(10, 2),
     Payment_Method VARCHAR(50),
     City VARCHAR(50),
-    Transaction_Date DATE
+    Transaction_Date DATE,
+    INDEX idx_transaction_date (Transaction_Date)
 );
 
 DROP TABLE IF EXISTS quality_metrics;
 CREATE TABLE quality_metrics (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    dataset VARCHAR(50) NOT NULL DEFAULT 'retail',
     metric_date DATE NOT NULL,
     pillar VARCHAR(50) NOT NULL,
     column_name VARCHAR(100),
@@ -42,12 +52,14 @@ CREATE TABLE quality_metrics (
     issues_count INT DEFAULT 0,
     total_count INT DEFAULT 0,
     description TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_metrics_pillar (dataset, metric_date, pillar, score)
 );
 
 DROP TABLE IF EXISTS quality_scores_history;
 CREATE TABLE quality_scores_history (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    dataset VARCHAR(50) NOT NULL DEFAULT 'retail',
     report_date DATE NOT NULL,
     completeness DECIMAL(5, 2),
     accuracy DECIMAL(5, 2),
@@ -56,7 +68,73 @@ CREATE TABLE quality_scores_history (
     uniqueness DECIMAL(5, 2),
     timeliness DECIMAL(5, 2),
     global_score DECIMAL(5, 2),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_scores_date (dataset, report_date)
+);
+
+DROP TABLE IF EXISTS pipeline_runs;
+CREATE TABLE pipeline_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    dataset VARCHAR(50) NOT NULL,
+    stage VARCHAR(50) NOT NULL,
+    started_at DATETIME NOT NULL,
+    duration_s DECIMAL(10, 3) NOT NULL,
+    rows_processed INT,
+    score DECIMAL(5, 2),
+    throughput_rps DECIMAL(12, 1),
+    status VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_runs_stage (dataset, stage, started_at)
+);
+
+DROP TABLE IF EXISTS quality_load_counters;
+CREATE TABLE quality_load_counters (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    dataset VARCHAR(50) NOT NULL,
+    source VARCHAR(255) NOT NULL,
+    load_date DATE NOT NULL,
+    rows_total INT NOT NULL DEFAULT 0,
+    null_product_name INT NOT NULL DEFAULT 0,
+    null_unit_price INT NOT NULL DEFAULT 0,
+    null_total_amount INT NOT NULL DEFAULT 0,
+    customer_id_valid INT NOT NULL DEFAULT 0,
+    customer_id_invalid INT NOT NULL DEFAULT 0,
+    price_valid INT NOT NULL DEFAULT 0,
+    price_invalid INT NOT NULL DEFAULT 0,
+    quantity_valid INT NOT NULL DEFAULT 0,
+    quantity_invalid INT NOT NULL DEFAULT 0,
+    total_consistent INT NOT NULL DEFAULT 0,
+    total_inconsistent INT NOT NULL DEFAULT 0,
+    null_dates INT NOT NULL DEFAULT 0,
+    past_dates INT NOT NULL DEFAULT 0,
+    distinct_ids_added INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_counters_dataset (dataset)
+);
+
+DROP TABLE IF EXISTS quality_counter_keys;
+CREATE TABLE quality_counter_keys (
+    dataset VARCHAR(50) NOT NULL,
+    Transaction_ID INT NOT NULL,
+    PRIMARY KEY (dataset, Transaction_ID)
+);
+
+DROP TABLE IF EXISTS quality_counter_dates;
+CREATE TABLE quality_counter_dates (
+    dataset VARCHAR(50) NOT NULL,
+    Transaction_Date DATE NOT NULL,
+    rows_count INT NOT NULL,
+    PRIMARY KEY (dataset, Transaction_Date)
+);
+
+DROP TABLE IF EXISTS stream_ledger;
+CREATE TABLE stream_ledger (
+    file_sha256 CHAR(64) PRIMARY KEY,
+    dataset VARCHAR(50) NOT NULL,
+    file_name VARCHAR(255) NOT NULL,
+    rows_loaded INT NOT NULL,
+    rows_published INT NOT NULL,
+    processed_at DATETIME NOT NULL
 );
 
 DROP VIEW IF EXISTS quality_dashboard;
@@ -72,5 +150,6 @@ SELECT
     global_score,
     created_at
 FROM quality_scores_history
+WHERE dataset = 'retail'
 ORDER BY report_date DESC
 LIMIT 1;
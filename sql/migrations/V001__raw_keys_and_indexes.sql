@@ -0,0 +1,6 @@
+-- retail_raw : empreinte de ligne et index de la charge (déduplication, import, différentiel)
+ALTER TABLE retail_raw ADD COLUMN IF NOT EXISTS row_hash BIGINT UNSIGNED AFTER Transaction_Date;
+CREATE INDEX IF NOT EXISTS idx_row_hash ON retail_raw (row_hash);
+CREATE INDEX IF NOT EXISTS idx_transaction_id ON retail_raw (Transaction_ID);
+CREATE INDEX IF NOT EXISTS idx_loaded_at ON retail_raw (loaded_at);
+CREATE INDEX IF NOT EXISTS idx_transaction_date ON retail_raw (Transaction_Date);
@@ -0,0 +1,2 @@
+-- retail_cleaned : partitions mensuelles du cache de validation et filtres de dates
+CREATE INDEX IF NOT EXISTS idx_transaction_date ON retail_cleaned (Transaction_Date);
@@ -0,0 +1,9 @@
+-- Colonnes multi-dataset (bases créées avant leur ajout)
+ALTER TABLE quality_metrics ADD COLUMN IF NOT EXISTS dataset VARCHAR(50) NOT NULL DEFAULT 'retail' AFTER id;
+ALTER TABLE quality_scores_history ADD COLUMN IF NOT EXISTS dataset VARCHAR(50) NOT NULL DEFAULT 'retail' AFTER id;
+
+-- Index couvrant des moyennes par pilier (AVG(score) WHERE dataset, metric_date, pillar) et des DELETE du jour
+CREATE INDEX IF NOT EXISTS idx_metrics_pillar ON quality_metrics (dataset, metric_date, pillar, score);
+
+-- Dernier score (moniteur d'alertes, vue quality_dashboard) et DELETE du jour
+CREATE INDEX IF NOT EXISTS idx_scores_date ON quality_scores_history (dataset, report_date);
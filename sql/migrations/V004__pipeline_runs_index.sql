@@ -0,0 +1,14 @@
+-- Historique par étape du canal performance (dq_alert_monitor.py)
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    dataset VARCHAR(50) NOT NULL,
+    stage VARCHAR(50) NOT NULL,
+    started_at DATETIME NOT NULL,
+    duration_s DECIMAL(10, 3) NOT NULL,
+    rows_processed INT,
+    score DECIMAL(5, 2),
+    throughput_rps DECIMAL(12, 1),
+    status VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_runs_stage ON pipeline_runs (dataset, stage, started_at);
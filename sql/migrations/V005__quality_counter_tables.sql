@@ -0,0 +1,38 @@
+-- Compteurs qualité par chargement (quality_counters.py) : créés une fois ici pour que le
+-- rafraîchissement des KPIs (run_kpis.py, micro-batchs) n'exécute que du DML
+CREATE TABLE IF NOT EXISTS quality_load_counters (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    dataset VARCHAR(50) NOT NULL,
+    source VARCHAR(255) NOT NULL,
+    load_date DATE NOT NULL,
+    rows_total INT NOT NULL DEFAULT 0,
+    null_product_name INT NOT NULL DEFAULT 0,
+    null_unit_price INT NOT NULL DEFAULT 0,
+    null_total_amount INT NOT NULL DEFAULT 0,
+    customer_id_valid INT NOT NULL DEFAULT 0,
+    customer_id_invalid INT NOT NULL DEFAULT 0,
+    price_valid INT NOT NULL DEFAULT 0,
+    price_invalid INT NOT NULL DEFAULT 0,
+    quantity_valid INT NOT NULL DEFAULT 0,
+    quantity_invalid INT NOT NULL DEFAULT 0,
+    total_consistent INT NOT NULL DEFAULT 0,
+    total_inconsistent INT NOT NULL DEFAULT 0,
+    null_dates INT NOT NULL DEFAULT 0,
+    past_dates INT NOT NULL DEFAULT 0,
+    distinct_ids_added INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_counters_dataset (dataset)
+);
+
+CREATE TABLE IF NOT EXISTS quality_counter_keys (
+    dataset VARCHAR(50) NOT NULL,
+    Transaction_ID INT NOT NULL,
+    PRIMARY KEY (dataset, Transaction_ID)
+);
+
+CREATE TABLE IF NOT EXISTS quality_counter_dates (
+    dataset VARCHAR(50) NOT NULL,
+    Transaction_Date DATE NOT NULL,
+    rows_count INT NOT NULL,
+    PRIMARY KEY (dataset, Transaction_Date)
+);
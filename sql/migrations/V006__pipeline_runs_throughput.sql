@@ -0,0 +1,3 @@
+-- Débit par étape (pipeline_metrics.py) pour les tables pipeline_runs créées avant son ajout :
+-- record_stage() n'exécute plus qu'un INSERT
+ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS throughput_rps DECIMAL(12, 1) AFTER score;
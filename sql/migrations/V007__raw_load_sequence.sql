@@ -0,0 +1,6 @@
+-- retail_raw : séquence de chargement croissante, départage des doublons de Transaction_ID
+-- (nettoyage et différentiel gardent la première ligne chargée, comme l'ordre du flux).
+-- Les lignes existantes sont numérotées dans leur ordre physique, c'est-à-dire d'insertion.
+ALTER TABLE retail_raw ADD COLUMN IF NOT EXISTS load_seq BIGINT UNSIGNED NOT NULL AUTO_INCREMENT AFTER loaded_at,
+    ADD INDEX IF NOT EXISTS idx_load_seq (load_seq);
+CREATE INDEX IF NOT EXISTS idx_transaction_id_seq ON retail_raw (Transaction_ID, load_seq);
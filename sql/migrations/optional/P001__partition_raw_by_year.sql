@@ -0,0 +1,14 @@
+-- Optionnel (migrate.py --with-optional) : partitionnement de retail_raw par année de transaction.
+-- retail_raw n'a pas de clé unique, la contrainte "colonne de partition dans chaque clé unique" ne s'applique pas.
+-- retail_cleaned n'est pas partitionnée : sa clé primaire Transaction_ID devrait inclure la date,
+-- ce qui casserait l'upsert par Transaction_ID du mode micro-batch.
+-- Les dates NULL sont rangées dans la première partition.
+ALTER TABLE retail_raw
+PARTITION BY RANGE COLUMNS (Transaction_Date) (
+    PARTITION p2022 VALUES LESS THAN ('2023-01-01'),
+    PARTITION p2023 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);